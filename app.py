@@ -3,9 +3,12 @@ import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 import streamlit as st
 import re
-from datetime import datetime
-from src.bridge_llama import SovereignLlamaBridge, DEFAULT_CONFIG
+import uuid
+from src.bridge_llama import SovereignLlamaBridge, resolve_config
 from src.agent_system import FinbenchSystem
+from src.audit_client import AuditServiceClient
+from src.audit_history import AuditHistoryStore
+from tracing import tracer  # same instance the src/ modules record into
 
 # UI configuraton
 st.set_page_config(
@@ -136,25 +139,64 @@ st.markdown("""
     """, unsafe_allow_html=True)
 
 # system intialization
-if "chat_history" not in st.session_state:
-    st.session_state.chat_history = []
+HISTORY_PAGE = 10            # messages rendered per page of the transcript
+HISTORY_CONTEXT_MESSAGES = 20  # recent messages sent to the bridge as conversation
+
+if "client_id" not in st.session_state:
+    # one owner id per browser, past sessions are listed and reopened only for their owner
+    st.session_state.client_id = st.query_params.get("client") or uuid.uuid4().hex
+if "session_id" not in st.session_state:
+    # the session id lives in the url, so a reload reopens the same audit
+    st.session_state.session_id = st.query_params.get("session") or uuid.uuid4().hex
+if "history_window" not in st.session_state:
+    st.session_state.history_window = HISTORY_PAGE
 
 @st.cache_resource
 def init_core():
     # Architectural design focused on epistemic integrity
+    # API clients inside the engine and bridge are only built on the first audit
+    config = resolve_config()
+    if config["AUDIT_SERVICE_URL"]:
+        return AuditServiceClient(config["AUDIT_SERVICE_URL"], config=config)
     engine = FinbenchSystem(
-        canonical_path=DEFAULT_CONFIG["CANONICAL_PATH"],
-        tavily_api_key=DEFAULT_CONFIG["TAVILY_API_KEY"]
+        canonical_path=config["CANONICAL_PATH"],
+        tavily_api_key=config["TAVILY_API_KEY"],
+        line_item_index_path=config["LINE_ITEM_INDEX_PATH"]
     )
-    return SovereignLlamaBridge(engine)
+    return SovereignLlamaBridge(engine, config=config)
 
 bridge = init_core()
 
+@st.cache_resource
+def init_history():
+    return AuditHistoryStore(bridge.config["HISTORY_DB_PATH"])
+
+history = init_history()
+client_id = st.session_state.client_id
+if not history.owned_by(st.session_state.session_id, client_id):
+    # a link to somebody else's session opens a fresh one instead of their transcript
+    st.session_state.session_id = uuid.uuid4().hex
+st.query_params["client"] = client_id
+st.query_params["session"] = st.session_state.session_id
+session_id = st.session_state.session_id
+
 def clean_output(text):
     def replace_headers(match):
         return f"### {match.group(1).replace('_', ' ').title()}"
     return re.sub(r'\[([A-Z_]+)\]', replace_headers, text)
 
+def flatten_trace(span, depth=0):
+    # one row per span, indented by nesting level
+    rows = [{
+        "stage": "  " * depth + span["name"],
+        "ms": span["duration_ms"],
+        "status": span["status"],
+        "detail": span["error"] or ", ".join(f"{k}={v}" for k, v in span["attrs"].items() if k != "audit_context")
+    }]
+    for child in span["children"]:
+        rows.extend(flatten_trace(child, depth + 1))
+    return rows
+
 # sidebar
 with st.sidebar:
     st.markdown("<h2 style='color: #1a73e8; margin-bottom: 0;'>Finance Auditor AI</h2>", unsafe_allow_html=True)
@@ -190,12 +232,39 @@ with st.sidebar:
 
     st.markdown("---")
     if st.button("New Audit Session", use_container_width=True):
-        st.session_state.chat_history = []
+        st.session_state.session_id = uuid.uuid4().hex
+        st.session_state.history_window = HISTORY_PAGE
+        st.session_state.active_ticker = None
         st.rerun()
 
+    past_sessions = [s for s in history.sessions(client_id, limit=15) if s["session_id"] != session_id]
+    if past_sessions:
+        with st.expander("🕘 RECENT SESSIONS", expanded=False):
+            for s in past_sessions:
+                label = (s["title"][:40] + "…") if len(s["title"]) > 40 else (s["title"] or "(empty)")
+                if st.button(f"{label} · {s['messages']} msgs", key=f"session_{s['session_id']}", use_container_width=True):
+                    st.session_state.session_id = s["session_id"]
+                    st.session_state.history_window = HISTORY_PAGE
+                    st.session_state.active_ticker = None
+                    st.rerun()
+
+    if bridge.config["DEBUG_PANEL"]:
+        with st.expander("🛠️ PIPELINE TRACES", expanded=False):
+            n_traces = st.number_input("Last N traces", min_value=1, max_value=50, value=5)
+            for trace in tracer.recent(int(n_traces)):
+                st.markdown(f"**{trace['attrs'].get('ticker') or trace['name']}** · {trace['duration_ms']} ms · {trace['status']}")
+                st.dataframe(flatten_trace(trace), use_container_width=True, hide_index=True)
+        if hasattr(bridge, "flights"):
+            with st.expander("🔁 COALESCED CALLS", expanded=False):
+                st.json(bridge.flights.snapshot())
+            with st.expander("⚡ SPECULATIVE PREFETCH", expanded=False):
+                st.json(bridge.prefetch_report())
+
 landing_placeholder = st.empty()
 
-if st.session_state.chat_history:
+total_messages = history.count(session_id)
+
+if total_messages:
     landing_placeholder.empty()
     st.markdown("""
         <div class="active-audit-header">
@@ -236,7 +305,14 @@ else:
 # Main Chat Container
 chat_container = st.container()
 with chat_container:
-    for msg in st.session_state.chat_history:
+    # only the recent window is rendered, older audits are paged in from the store
+    visible = history.recent(session_id, st.session_state.history_window)
+    hidden = total_messages - len(visible)
+    if hidden > 0 and st.button(f"Show earlier audits ({hidden} hidden)", use_container_width=True):
+        st.session_state.history_window += HISTORY_PAGE
+        st.rerun()
+
+    for msg in visible:
         with st.chat_message(msg["role"]):
             st.markdown(clean_output(msg["content"]))
             
@@ -268,7 +344,7 @@ query = st.chat_input("Enter ticker or question...")
 
 if query:
     landing_placeholder.empty() 
-    st.session_state.chat_history.append({"role": "user", "content": query})
+    history.append(session_id, "user", query, owner=client_id)
     
     with chat_container:
         with st.chat_message("user"):
@@ -277,11 +353,17 @@ if query:
         with st.chat_message("assistant"):
             with st.spinner("Analyzing..."):
                 try:
-                    history_str = "\n".join([f"{m['role'].upper()}: {m['content']}" for m in st.session_state.chat_history])
-                    result = bridge.smart_query(history_str)
+                    recent = history.recent(session_id, HISTORY_CONTEXT_MESSAGES)
+                    history_str = "\n".join([f"{m['role'].upper()}: {m['content']}" for m in recent])
+                    # the ticker this session audited last seeds the speculative prefetch
+                    result = bridge.smart_query(history_str, active_ticker=st.session_state.get("active_ticker"))
 
+                    metrics = {}
                     if isinstance(result, dict):
                         answer = result.get("answer", "")
+                        metrics = {k: result.get(k) for k in ("ticker", "roa", "turnover", "margin", "ppe_ratio", "usage") if k in result}
+                        if result.get("ticker"):
+                            st.session_state.active_ticker = result["ticker"]
                         # Ambil sources, tapi langsung kosongkan jika terdeteksi error limit
                         error_keywords = ["token has reached", "Rate Limit", "PRECISION LOCK"]
                         is_rate_limited = any(word.upper() in answer.upper() for word in error_keywords)
@@ -299,11 +381,7 @@ if query:
                                 st.markdown(f"○ {src}")
 
                     # Simpan ke history (Data yang disimpan sudah bersih dari sources jika error)
-                    st.session_state.chat_history.append({
-                        "role": "assistant", 
-                        "content": answer,
-                        "sources": sources
-                    })
+                    history.append(session_id, "assistant", answer, sources=sources, metrics=metrics, owner=client_id)
                     
                 except Exception as e:
                     st.error(f"Audit Session Error: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,98 @@
+import os
+import sys
+import json
+import time
+import glob
+import random
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+from canonicalizer import FinancialCanonicalizer
+
+LINE_ITEMS = ["Net sales", "Cost of sales", "Gross profit", "Operating income", "Income tax expense",
+              "Net income", "Total assets", "Total liabilities", "Cash and cash equivalents", "Inventories"]
+TEXT_ROWS = ["Exhibit 3.1", "Restated Certificate of Incorporation", "Large accelerated filer", "þ",
+             "Chief Executive Officer", "Signature", "Title", "Date", "Yes ¨ No þ", "Director"]
+
+
+def synthetic_tables(n, seed=7):
+    # roughly the mix seen in 10-K markdown: statements, small notes, cover-page / exhibit grids
+    rng = random.Random(seed)
+    tables = []
+    for _ in range(n):
+        kind = rng.random()
+        if kind < 0.35:
+            years = [str(2023 - i) for i in range(rng.randint(2, 3))]
+            lines = ["| (Millions) | " + " | ".join(years) + " |", "|---" * (len(years) + 1) + "|"]
+            for item in rng.sample(LINE_ITEMS, rng.randint(4, 10)):
+                cells = [rng.choice([f"$ {rng.randint(100, 99999):,}", f"({rng.randint(1, 999):,})", "—", f"{rng.randint(1, 60)}%"]) for _ in years]
+                lines.append(f"| {item} | " + " | ".join(cells) + " |")
+        else:
+            cols = rng.randint(2, 4)
+            lines = ["| " + " | ".join(rng.choice(TEXT_ROWS) for _ in range(cols)) + " |", "|---" * cols + "|"]
+            for _ in range(rng.randint(2, 12)):
+                lines.append("| " + " | ".join(rng.choice(TEXT_ROWS) for _ in range(cols)) + " |")
+        tables.append("\n".join(lines))
+    return tables
+
+
+def load_tables(input_dir):
+    tables = []
+    for path in glob.glob(os.path.join(input_dir, "*.json")):
+        with open(path, 'r', encoding='utf-8') as f:
+            tables.extend(item['content'] for item in json.load(f) if item.get('type') == 'table')
+    return tables
+
+
+def legacy_path(cleaner, md):
+    df = cleaner.parse_markdown_table(md)
+    if df is None:
+        return None
+    df = df.map(cleaner.clean_cell)
+    return df if cleaner.is_high_quality(df) else None
+
+
+def fast_path(cleaner, md):
+    scanned = cleaner.scan_markdown_table(md)
+    if scanned is None or not cleaner.is_high_quality_rows(*scanned):
+        return None
+    return cleaner.rows_to_frame(*scanned)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="legacy DataFrame path vs streaming pre-filter")
+    parser.add_argument("--input", help="decomposed json folder (defaults to synthetic tables)")
+    parser.add_argument("--tables", type=int, default=5000)
+    args = parser.parse_args()
+
+    tables = load_tables(args.input) if args.input else synthetic_tables(args.tables)
+    cleaner = FinancialCanonicalizer()
+    print(f"benchmarking {len(tables)} tables")
+
+    t0 = time.perf_counter()
+    legacy = [legacy_path(cleaner, md) for md in tables]
+    legacy_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    fast = [fast_path(cleaner, md) for md in tables]
+    fast_s = time.perf_counter() - t0
+
+    mismatches = 0
+    for a, b in zip(legacy, fast):
+        if (a is None) != (b is None):
+            mismatches += 1
+        elif a is not None and a.to_csv(index=False) != b.to_csv(index=False):
+            mismatches += 1
+
+    accepted = sum(1 for df in fast if df is not None)
+    print(f"accepted {accepted} / rejected {len(tables) - accepted} ({accepted / max(len(tables), 1):.1%} accept rate)")
+    print(f"legacy  : {legacy_s:.3f}s ({len(tables) / legacy_s:,.0f} tables/s)")
+    print(f"fast    : {fast_s:.3f}s ({len(tables) / fast_s:,.0f} tables/s)")
+    print(f"saved   : {legacy_s - fast_s:.3f}s ({1 - fast_s / legacy_s:.1%})")
+    print(f"output mismatches vs legacy: {mismatches}")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
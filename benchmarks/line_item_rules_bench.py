@@ -0,0 +1,112 @@
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+from line_item_rules import LineItemClassifier, RULES_PATH
+
+LABELS = [
+    "net sales", "total revenue", "cost of net sales", "net sales growth", "total revenues", "revenue",
+    "net income", "net earnings", "net income per share - diluted", "net income attributable to 3m",
+    "total assets", "total liabilities", "total liabilities and equity", "total liabilities and shareholders' equity",
+    "cost of sales", "gross profit", "gross margin %", "research and development", "selling, general and administrative expenses",
+    "operating income", "operating income margin", "interest expense", "provision for income taxes", "effective tax rate",
+    "income before income taxes", "diluted earnings per share", "basic earnings per share", "depreciation and amortization",
+    "accumulated depreciation and amortization", "stock-based compensation", "net cash provided by operating activities",
+    "net cash provided by (used in) operating activities", "purchases of property, plant and equipment", "capital expenditures",
+    "net cash used in investing activities", "net cash used in financing activities", "dividends paid", "dividends paid per share",
+    "purchases of treasury stock", "acquisitions, net of cash acquired", "free cash flow", "cash and cash equivalents",
+    "cash and cash equivalents at end of period", "accounts receivable, net", "allowance for accounts receivable", "inventories",
+    "total current assets", "property, plant and equipment, net", "goodwill", "goodwill impairment", "intangible assets, net",
+    "accounts payable", "accrued liabilities", "total current liabilities", "short-term borrowings", "long-term debt",
+    "current portion of long-term debt", "deferred revenue", "operating lease liabilities", "retained earnings", "treasury stock",
+    "total equity", "noncontrolling interest", "backlog", "number of employees", "restructuring charges", "impairment charges",
+    "other income (expense), net", "foreign currency translation", "weighted average diluted shares", "ebitda", "adjusted ebitda margin",
+]
+NOISE = ["", "(1)", "(a)", "total", "in millions", "—", "$", "2018", "fy2019", "continuing operations", "nan", "(2) (3)"]
+
+
+def legacy_classify(row_txt):
+    # the if/elif chain FinancialEvaluator used before the rule table
+    target_key = None
+    if "net sales" in row_txt or "total revenue" in row_txt:
+        if not any(x in row_txt for x in ["cost", "growth"]): target_key = "revenue"
+    elif "net income" in row_txt or "net earnings" in row_txt:
+        if not "per share" in row_txt: target_key = "net_income"
+    elif "total assets" in row_txt: target_key = "assets"
+    elif "total liabilities" in row_txt and "equity" not in row_txt: target_key = "liabilities"
+    return target_key
+
+
+def naive_classify(metrics, row_txt):
+    # same rule table evaluated as one linear chain of substring checks
+    for m in metrics:
+        if any(l in row_txt for l in m["labels"]):
+            if any(x in row_txt for x in m.get("exclude", [])):
+                if m.get("exclusive"):
+                    return None
+                continue
+            return m["name"]
+    return None
+
+
+def synthetic_rows(n, seed=7):
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(n):
+        parts = [rng.choice(NOISE), rng.choice(LABELS), rng.choice(NOISE)]
+        if rng.random() < 0.15:
+            parts.insert(2, rng.choice(LABELS))
+        rows.append(" ".join(p for p in parts if p).lower())
+    return rows
+
+
+def timed(fn, rows):
+    t0 = time.perf_counter()
+    out = [fn(r) for r in rows]
+    return out, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="compiled line-item rules vs the legacy if/elif chain")
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--rules", default=RULES_PATH)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    clf = LineItemClassifier.load(args.rules)
+    compile_s = time.perf_counter() - t0
+    rows = synthetic_rows(args.rows)
+    print(f"{len(clf.metrics)} metrics, {len(clf._owners)} phrases compiled in {compile_s * 1000:.1f} ms, {len(rows)} rows\n")
+
+    legacy, legacy_s = timed(legacy_classify, rows)
+    naive, naive_s = timed(lambda r: naive_classify(clf.metrics, r), rows)
+    compiled, compiled_s = timed(clf.classify, rows)
+    _, uncached_s = timed(clf._classify, rows)
+    # rows carrying one of the original four labels, where the substring fast path decides
+    core_rows = [r for r, a in zip(rows, legacy) if a]
+    _, core_legacy_s = timed(legacy_classify, core_rows)
+    _, core_fast_s = timed(clf._classify, core_rows)
+
+    # core metrics must map exactly as before, extended ones must follow the rule table
+    core = set(clf.core)
+    core_mismatch = [(r, a, b) for r, a, b in zip(rows, legacy, compiled) if a != (b if b in core else None)]
+    rule_mismatch = [(r, a, b) for r, a, b in zip(rows, naive, compiled) if a != b]
+
+    for name, secs in (("legacy chain (4 metrics)", legacy_s), (f"linear chain ({len(clf.metrics)} metrics)", naive_s),
+                       (f"compiled ({len(clf.metrics)} metrics)", compiled_s),
+                       ("compiled, no memo", uncached_s)):
+        print(f"{name:<28} {len(rows) / secs:>12,.0f} rows/s")
+    print(f"{len(set(rows))} distinct rows; {len(core_rows)} rows with a core label: legacy {len(core_rows) / core_legacy_s:,.0f} "
+          f"rows/s, compiled no memo {len(core_rows) / core_fast_s:,.0f} rows/s")
+    print(f"\nclassified: {sum(1 for c in compiled if c)} rows, core mismatches vs legacy: {len(core_mismatch)}, "
+          f"mismatches vs linear rule chain: {len(rule_mismatch)}")
+    for r, a, b in (core_mismatch + rule_mismatch)[:10]:
+        print(f"  {r!r}: expected {a}, got {b}")
+    sys.exit(1 if core_mismatch or rule_mismatch else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+from noise_lexicon import NoiseLexicon
+
+LEGACY_WORDS = ['buy', 'sell', 'long', 'short', 'reco', 'advice', 'target',
+                'bullish', 'bearish', 'hype', 'undervalued', 'overvalued', 'moon',
+                'surge', 'plunge', 'daily', 'news', 'rally', 'correction']
+FILLER = ("the company reported net sales and operating income for the fiscal year while long-term debt and "
+          "short-term borrowings were refinanced, selling general and administrative expenses rose, analysts "
+          "discussed networking revenue, shortfall risk and a target capital structure").split()
+NOISY = ["is it a buy", "bullish momentum", "price target raised", "shares surge", "should i sell", "to the moon",
+         "saham gorengan", "target harga", "precio objetivo", "kaufempfehlung", "看涨"]
+CASES = ["What is 3M's short-term debt and long-term debt?", "networking revenue of Cisco", "shortfall in receivables",
+         "selling, general and administrative expense trend", "long-lived assets impairment", "target capital structure",
+         "all in-store sales at Best Buy", "Moody's downgrade and interest expense", "conseil d'administration",
+         "the company puts its network upgrade online today", "Is AAPL a buy after the rally?",
+         "Haruskah saya beli? target harga?", "売り上げ高の推移", "買い物客の動向と売り場面積", "この株は買いですか"]
+
+
+def legacy_filter(text):
+    low = text.lower()
+    return [w for w in LEGACY_WORDS if w in low]
+
+
+def naive_filter(terms, text):
+    # substring loop over every lexicon term, what the old filter scales to
+    low = text.lower()
+    return [t for t in terms if t in low]
+
+
+def synthetic_text(chars, rng):
+    words, size = [], 0
+    while size < chars:
+        w = rng.choice(NOISY) if rng.random() < 0.01 else rng.choice(FILLER)
+        words.append(w)
+        size += len(w) + 1
+    return " ".join(words)
+
+
+def grow(lexicon, extra, rng):
+    # pad to a "thousands of terms" lexicon with random pseudo-words
+    terms = []
+    for _ in range(extra):
+        term = " ".join("".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(4, 9)))
+                        for _ in range(rng.randint(1, 3)))
+        lexicon.add(term, "sentiment", 0.5)
+        terms.append(term)
+    return terms
+
+
+def best_of(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="token-trie noise lexicon vs substring loops on long texts")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--extra-terms", type=int, default=5000)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    lexicon = NoiseLexicon.load()
+    base_terms = lexicon.size
+    terms = grow(lexicon, args.extra_terms, rng) + LEGACY_WORDS
+    print(f"lexicon: {base_terms} shipped terms + {args.extra_terms} synthetic = {lexicon.size}\n")
+
+    print(f"{'chars':>10} {'legacy 19 words':>16} {'substring all':>14} {'trie scan':>10} {'trie MB/s':>10}")
+    for size in args.sizes:
+        text = synthetic_text(size, rng)
+        legacy_s = best_of(lambda: legacy_filter(text))
+        naive_s = best_of(lambda: naive_filter(terms, text), repeat=1)
+        trie_s = best_of(lambda: lexicon.report(text))
+        print(f"{size:>10,} {legacy_s * 1000:>13.2f} ms {naive_s * 1000:>11.1f} ms {trie_s * 1000:>7.1f} ms {size / trie_s / 1e6:>10.2f}")
+
+    print("\nfalse positive check (legacy substring vs lexicon):")
+    for q in CASES:
+        print(f"  {q!r}\n    legacy: {legacy_filter(q)}  lexicon: {lexicon.report(q)['noise_elements']}")
+
+
+if __name__ == "__main__":
+    main()
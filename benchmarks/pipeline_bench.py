@@ -0,0 +1,308 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import tracemalloc
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, 'src'))
+from decomposition import decompose_markdown
+from canonicalizer import FinancialCanonicalizer
+from evaluator import FinancialEvaluator
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+DEFAULT_BASELINE = os.path.join(BASELINE_DIR, "pipeline.json")
+
+STATEMENT_ITEMS = ["Total revenue", "Net sales", "Cost of sales", "Gross profit", "Operating income",
+                   "Income tax expense", "Net income", "Total assets", "Total liabilities",
+                   "Cash and cash equivalents", "Inventories", "Depreciation and amortization",
+                   "Purchases of property, plant and equipment", "Long-term debt", "Retained earnings"]
+NOTE_ITEMS = ["Domestic", "International", "Foreign currency translation", "Unrecognized tax benefits",
+              "Restricted stock units", "Weighted-average exercise price", "Operating lease liabilities"]
+TEXT_CELLS = ["Exhibit 3.1", "Restated Certificate of Incorporation", "Large accelerated filer", "þ",
+              "Chief Executive Officer", "Signature", "Title", "Date", "Yes ¨ No þ", "Director"]
+SECTIONS = ["Item 1. Business", "Item 1A. Risk Factors", "Item 2. Properties", "Item 5. Market for Registrant's Common Equity",
+            "Item 7. Management's Discussion and Analysis", "Item 7A. Quantitative and Qualitative Disclosures About Market Risk",
+            "Item 8. Financial Statements and Supplementary Data", "Item 15. Exhibits"]
+PROSE = ("The Company evaluates its operating segments based on revenue and operating income. "
+         "Changes in foreign exchange rates, interest rates and commodity prices may adversely affect results. "
+         "Management believes the existing cash balances will be sufficient to meet liquidity needs.")
+
+
+def noisy_cell(rng):
+    # the cell shapes clean_cell has to handle in real 10-K tables
+    r = rng.random()
+    if r < 0.45:
+        return f"$ {rng.randint(100, 999999):,}" if rng.random() < 0.3 else f"{rng.randint(100, 999999):,}"
+    if r < 0.6:
+        return f"({rng.randint(1, 99999):,})"
+    if r < 0.7:
+        return f"{rng.uniform(0.1, 60):.1f}%"
+    if r < 0.8:
+        return rng.choice(["—", "-", "", "n/a"])
+    if r < 0.9:
+        return f"{rng.randint(1, 9999):,} (1)"
+    return f"{rng.uniform(0.01, 20):.2f}"
+
+
+def synthetic_table(rng, year):
+    kind = rng.random()
+    if kind < 0.4:
+        years = [str(year - i) for i in range(rng.randint(2, 3))]
+        lines = ["| (In millions) | " + " | ".join(years) + " |", "|---" * (len(years) + 1) + "|"]
+        for item in rng.sample(STATEMENT_ITEMS, rng.randint(5, 14)):
+            lines.append(f"| {item} | " + " | ".join(noisy_cell(rng) for _ in years) + " |")
+    elif kind < 0.7:
+        cols = rng.randint(2, 5)
+        lines = ["| | " + " | ".join(rng.choice(["Shares", "Amount", "Fair value", f"December 31, {year}"]) for _ in range(cols - 1)) + " |",
+                 "|---" * cols + "|"]
+        for _ in range(rng.randint(2, 8)):
+            lines.append(f"| {rng.choice(NOTE_ITEMS)} | " + " | ".join(noisy_cell(rng) for _ in range(cols - 1)) + " |")
+    else:
+        cols = rng.randint(2, 4)
+        lines = ["| " + " | ".join(rng.choice(TEXT_CELLS) for _ in range(cols)) + " |", "|---" * cols + "|"]
+        for _ in range(rng.randint(2, 12)):
+            lines.append("| " + " | ".join(rng.choice(TEXT_CELLS) for _ in range(cols)) + " |")
+    return "\n".join(lines)
+
+
+def synthetic_filing(n_tables, year, rng):
+    # section headings and prose between tables, about one table per two paragraphs as in 10-K markdown
+    parts, section = [], 0
+    for i in range(n_tables):
+        if i % max(1, n_tables // len(SECTIONS)) == 0 and section < len(SECTIONS):
+            parts.append(f"## {SECTIONS[section]}")
+            section += 1
+        parts.append(" ".join([PROSE] * rng.randint(1, 3)))
+        parts.append(synthetic_table(rng, year))
+    parts.append(PROSE)
+    return "\n\n".join(parts) + "\n"
+
+
+def write_corpus(root, n_tables, tables_per_filing, seed=11):
+    """markdown filings totalling n_tables tables, named like the real corpus (COMPANY_YEAR_10K.md)"""
+    rng = random.Random(seed)
+    md_dir = os.path.join(root, "markdown")
+    os.makedirs(md_dir, exist_ok=True)
+    paths, left, idx = [], n_tables, 0
+    while left > 0:
+        n = min(left, tables_per_filing)
+        year = 2018 + idx % 6
+        path = os.path.join(md_dir, f"CO{idx:05d}_{year}_10K.md")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(synthetic_filing(n, year, rng))
+        paths.append(path)
+        left -= n
+        idx += 1
+    return paths
+
+
+# stages: each takes the shared state, fills in what the next stage needs, returns items processed
+def stage_decompose(state):
+    state["decomposed"] = [(p, decompose_markdown(p)) for p in state["md_files"]]
+    state["tables"] = [item["content"] for _, items in state["decomposed"] for item in items if item["type"] == "table"]
+    return len(state["tables"])
+
+
+def stage_parse(state):
+    cleaner = state["cleaner"]
+    state["frames"] = [df for df in (cleaner.parse_markdown_table(md) for md in state["tables"]) if df is not None]
+    return len(state["frames"])
+
+
+def stage_clean_cell(state):
+    cleaner = state["cleaner"]
+    state["cleaned"] = [df.map(cleaner.clean_cell) for df in state["frames"]]
+    return sum(df.size for df in state["cleaned"])
+
+
+def stage_is_high_quality(state):
+    cleaner = state["cleaner"]
+    state["accepted"] = sum(1 for df in state["cleaned"] if cleaner.is_high_quality(df))
+    return len(state["cleaned"])
+
+
+def stage_process_file(state):
+    # the production canonicalizer path, decomposed json -> csv + dedup + line-item index
+    out = state["canonical_dir"]
+    shutil.rmtree(out, ignore_errors=True)
+    os.makedirs(out)
+    cleaner = FinancialCanonicalizer()
+    for path in state["json_files"]:
+        cleaner.process_file(path, out)
+    cleaner.save_table_refs(out)
+    cleaner.save_line_items(out)
+    return cleaner.stats["tables"]
+
+
+def stage_analyze_company(state):
+    evaluator = FinancialEvaluator(state["canonical_dir"])
+    for cid in state["companies"]:
+        evaluator.analyze_company(cid)
+    return len(state["companies"])
+
+
+STAGES = [
+    ("decompose_markdown", "tables", stage_decompose),
+    ("parse_markdown_table", "tables", stage_parse),
+    ("clean_cell", "cells", stage_clean_cell),
+    ("is_high_quality", "tables", stage_is_high_quality),
+    ("process_file", "tables", stage_process_file),
+    ("analyze_company", "companies", stage_analyze_company),
+]
+
+
+def prepare(root, n_tables, tables_per_filing):
+    md_files = write_corpus(root, n_tables, tables_per_filing)
+    json_dir = os.path.join(root, "decomposed")
+    os.makedirs(json_dir, exist_ok=True)
+    json_files = []
+    for path in md_files:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        out = os.path.join(json_dir, f"{stem}_decomposed.json")
+        with open(out, 'w', encoding='utf-8') as f:
+            json.dump(decompose_markdown(path), f)
+        json_files.append(out)
+    return {
+        "md_files": md_files,
+        "json_files": json_files,
+        "canonical_dir": os.path.join(root, "canonical"),
+        "companies": sorted({"_".join(os.path.basename(p).split("_")[:2]) for p in md_files}),
+        "cleaner": FinancialCanonicalizer(),
+        "md_bytes": sum(os.path.getsize(p) for p in md_files),
+    }
+
+
+def measure(fn, state, repeat, memory):
+    # best-of-n wall time untraced, then one traced pass for the peak (tracemalloc slows the stage down)
+    best, items = None, 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        items = fn(state)
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    peak_mb = None
+    if memory:
+        tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+        fn(state)
+        peak_mb = round((tracemalloc.get_traced_memory()[1] - base) / 1e6, 3)
+        tracemalloc.stop()
+    return {"seconds": round(best, 4), "items": items, "items_per_s": round(items / best, 1) if best else None, "peak_mb": peak_mb}
+
+
+def run(args):
+    sizes = [int(s) for s in args.sizes.split(",")]
+    only = set(args.stages.split(",")) if args.stages else None
+    report = {
+        "meta": {"created": datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+                 "machine": platform.machine(), "node": platform.node(), "tables_per_filing": args.tables_per_filing},
+        "results": {}
+    }
+    for n in sizes:
+        repeat = args.repeat if n < 10000 else 1
+        with tempfile.TemporaryDirectory() as tmp:
+            t0 = time.perf_counter()
+            state = prepare(tmp, n, args.tables_per_filing)
+            print(f"\n[{n} tables] {len(state['md_files'])} filings, {state['md_bytes'] / 1e6:.1f} MB markdown "
+                  f"(generated in {time.perf_counter() - t0:.1f}s)")
+            for name, unit, fn in STAGES:
+                if only and name not in only:
+                    # downstream stages still need their inputs
+                    fn(state)
+                    continue
+                r = measure(fn, state, repeat, not args.no_memory)
+                r["unit"] = unit
+                report["results"].setdefault(name, {})[str(n)] = r
+                peak = f"{r['peak_mb']:>9.2f} MB peak" if r["peak_mb"] is not None else ""
+                print(f"   {name:<22} {r['seconds']:>9.3f}s {r['items_per_s']:>12,.0f} {unit}/s {peak}")
+            print(f"   accepted {state['accepted']} / {len(state['cleaned'])} parsed tables")
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=4)
+        print(f"\nresults written to {args.save}")
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        return compare_reports(baseline, report, args.threshold, args.mem_threshold)
+    return 0
+
+
+def compare_reports(baseline, current, threshold, mem_threshold):
+    """flags stages whose throughput fell, or whose peak memory grew, by more than the thresholds"""
+    regressions = []
+    print(f"\n{'stage':<22} {'size':>7} {'base/s':>12} {'now/s':>12} {'Δ thr':>8} {'base MB':>9} {'now MB':>9} {'Δ mem':>8}")
+    for name, sizes in current["results"].items():
+        for size, now in sizes.items():
+            base = baseline["results"].get(name, {}).get(size)
+            if base is None:
+                print(f"{name:<22} {size:>7}   (no baseline)")
+                continue
+            d_thr = now["items_per_s"] / base["items_per_s"] - 1 if base["items_per_s"] else 0.0
+            d_mem = None
+            if now.get("peak_mb") is not None and base.get("peak_mb"):
+                d_mem = now["peak_mb"] / base["peak_mb"] - 1
+            flags = []
+            if d_thr < -threshold:
+                flags.append("THROUGHPUT")
+            # tiny peaks are dominated by allocator noise
+            if d_mem is not None and d_mem > mem_threshold and now["peak_mb"] - base["peak_mb"] > 1.0:
+                flags.append("MEMORY")
+            mem_cols = f"{base.get('peak_mb') or 0:>9.2f} {now.get('peak_mb') or 0:>9.2f} " + (f"{d_mem:>+8.1%}" if d_mem is not None else f"{'-':>8}")
+            print(f"{name:<22} {size:>7} {base['items_per_s']:>12,.0f} {now['items_per_s']:>12,.0f} {d_thr:>+8.1%} {mem_cols}"
+                  + (f"  <- {' + '.join(flags)}" if flags else ""))
+            if flags:
+                regressions.append(f"{name} @ {size}: {', '.join(flags).lower()}")
+
+    if regressions:
+        print("\nREGRESSIONS:")
+        for r in regressions:
+            print(f" - {r}")
+        return 1
+    print("\nno regressions")
+    return 0
+
+
+def compare(args):
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(args.current, 'r', encoding='utf-8') as f:
+        current = json.load(f)
+    return compare_reports(baseline, current, args.threshold, args.mem_threshold)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="throughput / peak memory of the offline pipeline stages on synthetic filings")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_run = sub.add_parser("run", help="benchmark every stage at each corpus size")
+    p_run.add_argument("--sizes", default="10,100,1000,10000", help="comma separated table counts, up to 100000")
+    p_run.add_argument("--tables-per-filing", type=int, default=150)
+    p_run.add_argument("--stages", help="comma separated subset of " + ",".join(s[0] for s in STAGES))
+    p_run.add_argument("--repeat", type=int, default=3, help="best-of-n timing below 10k tables")
+    p_run.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    p_run.add_argument("--save", help=f"write results as a JSON baseline (e.g. {os.path.relpath(DEFAULT_BASELINE, ROOT)})")
+    p_run.add_argument("--baseline", help="compare against this baseline after the run")
+
+    p_cmp = sub.add_parser("compare", help="compare two saved result files")
+    p_cmp.add_argument("baseline", nargs="?", default=DEFAULT_BASELINE, help=f"default {os.path.relpath(DEFAULT_BASELINE, ROOT)}")
+    p_cmp.add_argument("current")
+
+    for p in (p_run, p_cmp):
+        p.add_argument("--threshold", type=float, default=0.15, help="allowed throughput drop")
+        p.add_argument("--mem-threshold", type=float, default=0.25, help="allowed peak memory growth")
+
+    args = parser.parse_args()
+    sys.exit(run(args) if args.command == "run" else compare(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import os
+import sys
+import time
+import glob
+import json
+import argparse
+import tempfile
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, 'src'))
+sys.path.append(os.path.join(ROOT, 'benchmarks'))
+from quantized_index import QuantizedIndex
+
+MODES = [("float", True), ("int8", False), ("int8", True), ("binary", False), ("binary", True)]
+
+
+def synthetic(n, dim, n_queries, seed=3):
+    # clustered unit vectors, roughly the geometry of filing chunks around topics
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(8, n // 200), dim))
+    vectors = centers[rng.integers(0, len(centers), n)] + 0.6 * rng.normal(size=(n, dim))
+    queries = vectors[rng.integers(0, n, n_queries)] + 0.4 * rng.normal(size=(n_queries, dim))
+    return [f"doc::{i}" for i in range(n)], vectors.astype(np.float32), None, [{"vec": q} for q in queries]
+
+
+def financebench(args):
+    # chunk vectors from built shards when present, otherwise embedded here with the indexer's model
+    from indexer import FinancialIndexer
+    from retrieval_bench import load_questions, label_relevant
+    indexer = FinancialIndexer()
+    files = glob.glob(os.path.join(args.input, "*.json"))
+    chunks = list(indexer.iter_chunks(files))
+    shard_files = sorted(glob.glob(os.path.join(args.shard_dir, "shard_*", "meta.jsonl")))
+    if shard_files:
+        by_id = {}
+        for meta in shard_files:
+            vecs = np.load(os.path.join(os.path.dirname(meta), "embeddings.npy"))
+            with open(meta, 'r', encoding='utf-8') as f:
+                for row, line in zip(vecs, f):
+                    by_id[json.loads(line)["id"]] = row
+        chunks = [c for c in chunks if c.metadata["chunk_id"] in by_id]
+        vectors = np.stack([by_id[c.metadata["chunk_id"]] for c in chunks])
+    else:
+        vectors = np.asarray(indexer.embeddings.embed_documents([c.page_content for c in chunks]), dtype=np.float32)
+    questions = label_relevant(load_questions(args.benchmark, {os.path.basename(f) for f in files}), chunks)
+    for q in questions:
+        q["vec"] = np.asarray(indexer.embeddings.embed_query(q["question"]), dtype=np.float32)
+    return [c.metadata["chunk_id"] for c in chunks], vectors, [c.metadata for c in chunks], questions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="int8 / binary codes with float re-rank vs the float32 index")
+    parser.add_argument("--synthetic", type=int, default=0, help="n synthetic vectors instead of FinanceBench")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--input", default="data/processed/decomposed")
+    parser.add_argument("--benchmark", default="data/financebench_merged.jsonl")
+    parser.add_argument("--shard-dir", default="data/database/shards")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--candidates", type=int, default=100)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        ids, vectors, metas, queries = synthetic(args.synthetic, args.dim, args.queries)
+    else:
+        ids, vectors, metas, queries = financebench(args)
+    if not queries:
+        print("no labelled questions")
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        QuantizedIndex.build(ids, vectors, metas).save(tmp)
+        index = QuantizedIndex.load(tmp)
+        mem = index.memory_bytes()
+        print(f"{len(index)} vectors x {vectors.shape[1]} dims, {len(queries)} queries, k={args.k}, shortlist={args.candidates}")
+        print(f"resident: float32 {mem['float32'] / 1e6:.2f} MB | int8 {mem['int8'] / 1e6:.2f} MB "
+              f"({mem['float32'] / mem['int8']:.1f}x smaller) | binary {mem['binary'] / 1e6:.2f} MB "
+              f"({mem['float32'] / mem['binary']:.1f}x smaller), each including "
+              f"{mem['metadata'] / 1e6:.2f} MB of ids and filter fields\n")
+
+        exact = [[d for d, _ in index.search(q["vec"], k=args.k, mode="float")] for q in queries]
+        print(f"{'mode':<16} {'overlap@k':>10} {'evidence R@k':>13} {'p50 ms':>8} {'p95 ms':>8}")
+        for mode, rerank in MODES:
+            lat, overlap, hits = [], 0.0, 0
+            for q, ref in zip(queries, exact):
+                t0 = time.perf_counter()
+                found = [d for d, _ in index.search(q["vec"], k=args.k, mode=mode, candidates=args.candidates, rerank=rerank)]
+                lat.append(time.perf_counter() - t0)
+                overlap += len(set(found) & set(ref)) / len(ref)
+                if "relevant" in q and q["relevant"] & set(found):
+                    hits += 1
+            lat.sort()
+            p = lambda x: lat[min(len(lat) - 1, int(x * len(lat)))] * 1000
+            evidence = f"{hits / len(queries):.3f}" if "relevant" in queries[0] else "-"
+            name = f"{mode}{' + rerank' if rerank and mode != 'float' else ''}"
+            print(f"{name:<16} {overlap / len(queries):>10.3f} {evidence:>13} {p(0.5):>8.2f} {p(0.95):>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
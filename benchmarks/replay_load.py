@@ -0,0 +1,128 @@
+import os
+import sys
+import time
+import argparse
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+import bridge_llama
+from bridge_llama import SovereignLlamaBridge, resolve_config, PRECISION_LOCK_MSG
+from agent_system import FinbenchSystem
+from replay import Replayer, FaultInjector, FIXTURE_DIR, NO_SEARCH_CLIENT
+
+QUERIES = ["Audit the asset structure of AAPL", "Is NVDA margin driven by pricing power?",
+           "Stress test MMM capital intensity", "Decompose AMZN ROA", "Is MSFT a buy after the rally?"]
+
+
+def classify(result):
+    answer = result.get("answer", "")
+    if answer == PRECISION_LOCK_MSG:
+        return "precision_lock"
+    if answer.startswith("[BRIDGE_ERROR]"):
+        return "bridge_error"
+    if "INTERNAL_SYSTEM_ERROR" in answer:
+        return "internal_error"
+    if answer.startswith("SYSTEM_MESSAGE: No valid ticker"):
+        return "no_ticker"
+    if "Epistemic Block" in answer:
+        return "data_insufficient"
+    return "ok"
+
+
+def build_bridge(args):
+    config = resolve_config({"TOKENS_PER_MINUTE": args.tpm})
+    engine = FinbenchSystem(canonical_path=config["CANONICAL_PATH"], tavily_api_key=config["TAVILY_API_KEY"],
+                            line_item_index_path=config["LINE_ITEM_INDEX_PATH"])
+    return SovereignLlamaBridge(engine, config=config)
+
+
+def record(args):
+    # one live pass over the query set, needs GROQ_API_KEY / TAVILY_API_KEY and network
+    replayer = Replayer(args.fixtures, mode="record")
+    bridge = replayer.install(build_bridge(args))
+    for q in QUERIES:
+        res = bridge.smart_query(q)
+        print(f"recorded {q!r}: {classify(res)}")
+    replayer.save()
+    print(f"fixtures written to {args.fixtures}: {len(replayer.tickers)} tickers, "
+          f"{len(replayer.tavily) - (NO_SEARCH_CLIENT in replayer.tavily)} searches, {len(replayer.groq)} completions")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="offline load test of SovereignLlamaBridge.smart_query on recorded fixtures")
+    parser.add_argument("--fixtures", default=FIXTURE_DIR)
+    parser.add_argument("--record", action="store_true", help="record fixtures from the live services and exit")
+    parser.add_argument("--sessions", type=int, default=16, help="concurrent sessions")
+    parser.add_argument("--requests", type=int, default=10, help="queries per session")
+    parser.add_argument("--yf-latency", type=float, default=0.4)
+    parser.add_argument("--tavily-latency", type=float, default=0.8)
+    parser.add_argument("--groq-latency", type=float, default=1.5)
+    parser.add_argument("--jitter", type=float, default=0.3, help="fraction of each latency")
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.02, help="groq 429s")
+    parser.add_argument("--tpm", type=int, default=12000, help="TOKENS_PER_MINUTE for the local budget")
+    parser.add_argument("--no-cache", action="store_true", help="refetch statements on every audit")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.record:
+        return record(args)
+
+    try:
+        bridge_llama.load_constitution()
+    except RuntimeError as e:
+        # the governance prompt is private; prompt size differs but the request path is the same
+        print(f"note: {e}; using a placeholder constitution")
+        bridge_llama.load_constitution = lambda: "You are a neutral financial auditor."
+
+    profile = {}
+    for service, latency in (("yfinance", args.yf_latency), ("tavily", args.tavily_latency), ("groq", args.groq_latency)):
+        profile[service] = {"latency_s": latency, "jitter_s": latency * args.jitter, "error_rate": args.error_rate}
+    profile["groq"]["rate_limit_rate"] = args.rate_limit_rate
+    faults = FaultInjector(profile, seed=args.seed)
+    replayer = Replayer(args.fixtures, mode="replay", faults=faults)
+    if not replayer.groq:
+        print(f"no fixtures in {args.fixtures}, run with --record first")
+        return
+    bridge = replayer.install(build_bridge(args))
+    if args.no_cache:
+        bridge.engine.statements.ttl_s = 0
+
+    def session(s):
+        out = []
+        for i in range(args.requests):
+            t0 = time.perf_counter()
+            try:
+                kind = classify(bridge.smart_query(QUERIES[(s + i) % len(QUERIES)]))
+            except Exception as e:
+                kind = f"exception:{type(e).__name__}"
+            out.append((kind, time.perf_counter() - t0))
+        return out
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.sessions) as pool:
+        results = [r for rs in pool.map(session, range(args.sessions)) for r in rs]
+    elapsed = time.perf_counter() - start
+
+    kinds = Counter(k for k, _ in results)
+    lat = sorted(t for _, t in results)
+    def pct(p):
+        return round(lat[min(len(lat) - 1, int(p * len(lat)))] * 1000, 1)
+
+    print(f"{len(results)} audits from {args.sessions} sessions in {elapsed:.2f}s "
+          f"({len(results) / elapsed:.2f} audits/s, {kinds['ok'] / elapsed:.2f} ok/s)")
+    print(f"latency  : p50 {pct(0.5)} ms, p95 {pct(0.95)} ms, p99 {pct(0.99)} ms")
+    print(f"outcomes : {dict(kinds)}")
+    print(f"injected : {faults.injected}")
+    print(f"fixtures : {replayer.stats}")
+    print(f"coalesced: {bridge.flights.snapshot()}")
+    print(f"prefetch : {bridge.prefetch_report()}")
+    live = replayer.live_clients(bridge)
+    if live:
+        print(f"FAILED: live clients built during the replay: {', '.join(live)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+from indexer import FinancialIndexer
+from lexical_index import BM25Index, tokenize
+from chunker import parse_filing_name
+
+
+def load_questions(path, sources):
+    questions = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            row = json.loads(line)
+            source = f"{row['doc_name']}_decomposed.json"
+            if source not in sources:
+                continue
+            evidence = " ".join(e.get("evidence_text", "") for e in row.get("evidence", []))
+            questions.append({"id": row["financebench_id"], "question": row["question"], "source": source, "evidence": set(tokenize(evidence))})
+    return questions
+
+
+def label_relevant(questions, chunks, min_overlap=0.6):
+    # a chunk is relevant when most of its vocabulary sits inside the evidence page
+    chunk_terms = {c.metadata["chunk_id"]: (c.metadata["source"], set(tokenize(c.page_content))) for c in chunks}
+    for q in questions:
+        q["relevant"] = {
+            cid for cid, (source, terms) in chunk_terms.items()
+            if source == q["source"] and len(terms) >= 20 and len(terms & q["evidence"]) / len(terms) >= min_overlap
+        }
+    return [q for q in questions if q["relevant"]]
+
+
+def evaluate(name, search, questions, ks):
+    latencies, hits = [], {k: 0 for k in ks}
+    for q in questions:
+        t0 = time.perf_counter()
+        ranked = search(q)
+        latencies.append(time.perf_counter() - t0)
+        for k in ks:
+            if q["relevant"] & set(ranked[:k]):
+                hits[k] += 1
+    latencies.sort()
+    p = lambda x: latencies[min(len(latencies) - 1, int(x * len(latencies)))] * 1000
+    recall = " ".join(f"R@{k} {hits[k] / len(questions):.3f}" for k in ks)
+    print(f"{name:<8} {recall} | p50 {p(0.5):.2f} ms p95 {p(0.95):.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="dense vs BM25 vs hybrid retrieval on FinanceBench evidence")
+    parser.add_argument("--input", default="data/processed/decomposed")
+    parser.add_argument("--benchmark", default="data/financebench_merged.jsonl")
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 5, 10])
+    parser.add_argument("--no-dense", action="store_true", help="skip modes that need the persisted vector store")
+    parser.add_argument("--filter-doc", action="store_true", help="restrict each query to its own filing")
+    parser.add_argument("--filter-company", action="store_true", help="restrict each query to its company / period metadata")
+    args = parser.parse_args()
+
+    indexer = FinancialIndexer()
+    indexer.input_dir = args.input
+    files = [os.path.join(args.input, f) for f in os.listdir(args.input) if f.endswith(".json")]
+    chunks = list(indexer.iter_chunks(files))
+
+    t0 = time.perf_counter()
+    bm25 = BM25Index()
+    for c in chunks:
+        bm25.add(c.metadata["chunk_id"], c.page_content, c.metadata)
+    print(f"{len(chunks)} chunks from {len(files)} filings, BM25 built in {time.perf_counter() - t0:.2f}s")
+    sections = {}
+    for c in chunks:
+        sections[c.metadata["section"]] = sections.get(c.metadata["section"], 0) + 1
+    print("chunks per section: " + ", ".join(f"{s} {n}" for s, n in sorted(sections.items(), key=lambda x: -x[1])[:8]))
+
+    questions = label_relevant(load_questions(args.benchmark, {os.path.basename(f) for f in files}), chunks)
+    print(f"{len(questions)} questions with labelled evidence chunks\n")
+    if not questions:
+        return
+
+    def where(q):
+        if args.filter_doc:
+            return {"source": q["source"]}
+        if args.filter_company:
+            meta = parse_filing_name(q["source"])
+            return {"company": meta["company"], "period": meta["period"]}
+        return None
+
+    top = max(args.k)
+    indexer._lexical = bm25
+    evaluate("lexical", lambda q: [d for d, _ in bm25.search(q["question"], k=top, where=where(q))], questions, args.k)
+    if not args.no_dense:
+        for mode in ("dense", "hybrid"):
+            evaluate(mode, lambda q: [r["chunk_id"] for r in indexer.search(q["question"], k=top, where=where(q), mode=mode, with_content=False)],
+                     questions, args.k)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import os
+import sys
+import time
+import argparse
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+from audit_client import AuditServiceClient
+
+QUERIES = ["Audit the asset structure of AAPL", "Is NVDA margin driven by pricing power?",
+           "Stress test MMM capital intensity", "Decompose AMZN ROA"]
+
+
+def main():
+    # start the target first, e.g. `python src/audit_service.py --stub --workers 4 --queue 16`
+    parser = argparse.ArgumentParser(description="concurrent load against the audit service")
+    parser.add_argument("--url", default="http://127.0.0.1:8080")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    client = AuditServiceClient(args.url)
+
+    def one(i):
+        t0 = time.perf_counter()
+        res = client.smart_query(QUERIES[i % len(QUERIES)])
+        answer = res.get("answer", "")
+        kind = "busy" if "SERVICE BUSY" in answer else "error" if "SERVICE_ERROR" in answer else "ok"
+        return kind, time.perf_counter() - t0
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as pool:
+        results = list(pool.map(one, range(args.requests)))
+    elapsed = time.perf_counter() - start
+
+    kinds = Counter(k for k, _ in results)
+    ok_lat = sorted(t for k, t in results if k == "ok")
+    def pct(p):
+        return round(ok_lat[min(len(ok_lat) - 1, int(p * len(ok_lat)))] * 1000, 1) if ok_lat else None
+
+    print(f"{args.requests} requests from {args.clients} clients in {elapsed:.2f}s ({kinds['ok'] / elapsed:.1f} audits/s)")
+    print(f"outcomes : {dict(kinds)}")
+    print(f"latency  : p50 {pct(0.5)} ms, p95 {pct(0.95)} ms, p99 {pct(0.99)} ms")
+    print(f"service  : {client.metrics()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC = os.path.join(ROOT, "src")
+BUDGET_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup_budget.json")
+
+# first render of app.py through streamlit's headless script runner
+RENDER_SNIPPET = """
+import time
+t0 = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file("app.py", default_timeout=120)
+at.run()
+print(round((time.perf_counter() - t0) * 1000, 1))
+"""
+
+
+def import_profile(module):
+    # run `python -X importtime` in a clean interpreter and parse its report
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([SRC, ROOT]))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cum_us, name = line[len("import time:"):].split("|")
+        # nesting depth is encoded as two spaces per level in front of the name
+        entries.append({"module": name[1:].rstrip(), "self_us": int(self_us), "cumulative_us": int(cum_us)})
+
+    top_level = [e for e in entries if not e["module"].startswith(" ")]
+    loaded = {e["module"].strip().split(".")[0] for e in entries}
+    total_ms = sum(e["cumulative_us"] for e in top_level if e["module"] == module) / 1000
+    return {
+        "module": module,
+        "ok": proc.returncode == 0,
+        "error": proc.stderr.strip().splitlines()[-1] if proc.returncode != 0 and proc.stderr.strip() else None,
+        "total_ms": round(total_ms, 2),
+        "top": sorted(top_level, key=lambda e: -e["cumulative_us"])[:10],
+        "loaded_packages": sorted(loaded)
+    }
+
+
+def first_render_ms():
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-c", RENDER_SNIPPET], cwd=ROOT, capture_output=True, text=True)
+    wall_ms = round((time.perf_counter() - start) * 1000, 1)
+    if proc.returncode != 0:
+        return {"ok": False, "wall_ms": wall_ms, "error": proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "unknown"}
+    return {"ok": True, "wall_ms": wall_ms, "script_ms": float(proc.stdout.strip().splitlines()[-1])}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="cold start report for app.py and the bridge")
+    parser.add_argument("--skip-render", action="store_true", help="only run the import-time profile")
+    parser.add_argument("--json", help="write the full report to this path")
+    args = parser.parse_args()
+
+    with open(BUDGET_FILE, "r", encoding="utf-8") as f:
+        budget = json.load(f)
+
+    report = {"imports": [], "render": None, "violations": []}
+    for module, limit_ms in budget["import_ms"].items():
+        prof = import_profile(module)
+        report["imports"].append(prof)
+        print(f"\n[{module}] {prof['total_ms']} ms (budget {limit_ms} ms)")
+        if not prof["ok"]:
+            report["violations"].append(f"{module}: import failed ({prof['error']})")
+            continue
+        for e in prof["top"]:
+            print(f"   {e['cumulative_us'] / 1000:>9.2f} ms  {e['module'].strip()}")
+        if prof["total_ms"] > limit_ms:
+            report["violations"].append(f"{module}: {prof['total_ms']} ms > {limit_ms} ms")
+        eager = sorted(set(budget["lazy_packages"]) & set(prof["loaded_packages"]))
+        if eager:
+            report["violations"].append(f"{module}: eagerly imports {', '.join(eager)}")
+
+    if not args.skip_render:
+        render = first_render_ms()
+        report["render"] = render
+        print(f"\n[app.py first render] {render}")
+        if not render["ok"]:
+            report["violations"].append(f"app.py: first render failed ({render['error']})")
+        elif render["wall_ms"] > budget["first_render_ms"]:
+            report["violations"].append(f"app.py: first render {render['wall_ms']} ms > {budget['first_render_ms']} ms")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
+
+    if report["violations"]:
+        print("\nSTARTUP BUDGET EXCEEDED:")
+        for v in report["violations"]:
+            print(f" - {v}")
+        sys.exit(1)
+    print("\nstartup within budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,6 @@
 import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 from src.canonicalizer import FinancialCanonicalizer
 
 def main():
@@ -9,18 +11,34 @@ def main():
         os.makedirs(output_dir)
         
     cleaner = FinancialCanonicalizer()
+    cleaner.load_table_refs(output_dir)
+    cleaner.load_line_items(output_dir)
     files = [f for f in os.listdir(input_dir) if f.endswith('.json')]
     
     print(f"starting cleaning the data : {len(files)} file...")
     
     total_tables = 0
     for file in files:
+        # refs persist across runs: the filing's previous tables leave the registry first, so tables
+        # of other filings that resolve to them are handed over instead of pointing at rewritten csv files
+        cleaner.forget_filing(file[:-len("_decomposed.json")] if file.endswith("_decomposed.json") else file[:-5], output_dir)
         count = cleaner.process_file(os.path.join(input_dir, file), output_dir)
         print(f" {file}: succeed extract {count} tabel.")
         total_tables += count
         
+    cleaner.save_table_refs(output_dir)
+    cleaner.save_line_items(output_dir)
     print(f"\ntotal tables has been extracted {total_tables} ")
 
+    stats = cleaner.stats
+    seen = max(stats["tables"], 1)
+    print(f"accept/reject mix : {stats['accepted']} accepted ({stats['accepted'] / seen:.1%}), "
+          f"{stats['rejected_quality']} low quality, {stats['rejected_shape']} malformed")
+    print(f"scan+filter {stats['scan_s']:.2f}s, materialize+write {stats['write_s']:.2f}s")
+    print(f"deduplicated {stats['duplicates']} tables ({stats['bytes_saved'] / 1024:.0f} KB not written), "
+          f"{stats['near_duplicates']} near duplicates flagged")
+    print(f"line-item index: {len(cleaner.line_items)} cells across {len(cleaner.line_items.tables)} tables")
+
 if __name__ == "__main__":
 
     main()
@@ -1,5 +1,7 @@
 import os
+import sys
 import json
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 from src.evaluator import FinancialEvaluator
 
 def main():
@@ -12,7 +14,7 @@ def main():
     evaluator = FinancialEvaluator(CANONICAL_DIR)
     
     # get unique ID for every company
-    all_files = os.listdir(CANONICAL_DIR)
+    all_files = os.listdir(CANONICAL_DIR) + [f"{dup}.csv" for dup in evaluator.table_refs.duplicates]
     company_ids = set()
     for f in all_files:
         if f.endswith('.csv'):
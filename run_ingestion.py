@@ -0,0 +1,54 @@
+import os
+import sys
+import json
+import argparse
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+from src.ingestion import IngestionPipeline
+
+def main():
+    parser = argparse.ArgumentParser(description="markdown -> decomposed -> canonical -> evaluations (+ index), pipelined")
+    parser.add_argument("--markdown", default=os.path.join("data", "processed", "markdown"))
+    parser.add_argument("--decomposed", default=os.path.join("data", "processed", "decomposed"))
+    parser.add_argument("--canonical", default=os.path.join("data", "processed", "canonical"))
+    parser.add_argument("--evaluations", default=os.path.join("data", "results", "evaluations"))
+    parser.add_argument("--manifest", default=None, help="defaults to ingestion_manifest.json next to the canonical dir")
+    parser.add_argument("--no-index", action="store_true", help="skip the embedding / BM25 stage")
+    parser.add_argument("--queue-size", type=int, default=8, help="bound of every queue between stages")
+    parser.add_argument("--decompose-workers", type=int, default=2)
+    parser.add_argument("--force", action="store_true", help="recompute every node regardless of the manifest")
+    parser.add_argument("--json", help="write the stage report to this path")
+    args = parser.parse_args()
+
+    pipeline = IngestionPipeline(
+        markdown_dir=args.markdown, decomposed_dir=args.decomposed, canonical_dir=args.canonical,
+        evaluations_dir=args.evaluations, manifest_path=args.manifest, index=not args.no_index,
+        queue_size=args.queue_size, decompose_workers=args.decompose_workers
+    )
+    report = pipeline.run(force=args.force)
+    if report is None:
+        return
+
+    print(f"\n{report['filings']} filings in {report['wall_s']:.2f}s")
+    print(f"{'stage':<13} {'done':>5} {'cached':>6} {'failed':>6} {'busy s':>8} {'items/s':>8} {'util':>6} {'queue avg':>9} {'max':>4} {'full':>6}")
+    for name, s in report["stages"].items():
+        rate = f"{s['items_per_s']:.2f}" if s["items_per_s"] is not None else "-"
+        print(f"{name:<13} {s['computed']:>5} {s['skipped']:>6} {s['failed'] + s['upstream_failed']:>6} {s['busy_s']:>8.2f} "
+              f"{rate:>8} {s['utilization']:>6.0%} {s['queue_mean']:>9.2f} {s['queue_max']:>4} {s['queue_full_pct']:>5.1f}%")
+    failed = {name: s["failed"] for name, s in report["stages"].items() if s["failed"]}
+    if failed:
+        print(f"\nfailed nodes: {failed}, they are left out of the manifest and retried on the next run")
+    if report["incomplete"]:
+        print(f"evaluated while these filings failed (their last good tables, if any, were used): {report['incomplete']}")
+    if report["unevaluated"]:
+        print(f"not evaluated, every filing failed: {', '.join(report['unevaluated'])}")
+    if report["bottleneck"]:
+        print(f"\nbottleneck: {report['bottleneck']} (highest utilization; the queue in front of it fills up)")
+    elif not failed:
+        print("\nnothing to recompute, every node is up to date")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=4)
+
+if __name__ == "__main__":
+    main()
@@ -1,68 +1,114 @@
+import re
 import json
-import yfinance as yf
 from datetime import datetime, timedelta
-from tavily import TavilyClient
-from evaluator import FinancialEvaluator
+from tracing import tracer
+from statement_store import StatementStore
+from single_flight import SingleFlight
+
+# (statement, candidate line items) per fundamental, first match wins
+FUNDAMENTAL_KEYS = {
+    "revenue": ("income_stmt", ['Total Revenue', 'TotalRevenue']),
+    "net_income": ("income_stmt", ['Net Income', 'NetIncome']),
+    "total_assets": ("balance_sheet", ['Total Assets', 'TotalAssets']),
+    "ppe_net": ("balance_sheet", ['Net PPE', 'Property Plant Equipment Net', 'Fixed Assets']),
+    "inventory": ("balance_sheet", ['Inventory', 'Stock']),
+    "total_liabilities": ("balance_sheet", ['Total Liabilities Net Minority Interest', 'TotalLiabilities']),
+    "equity": ("balance_sheet", ['Stockholders Equity', 'Total Equity Gross Minority Interest'])
+}
 
 class FinbenchSystem:
-    def __init__(self, canonical_path, tavily_api_key):
-        self.evaluator = FinancialEvaluator(canonical_path)
+    def __init__(self, canonical_path, tavily_api_key, line_item_index_path=None):
+        self.canonical_path = canonical_path
         self.tavily_api_key = tavily_api_key
-        self.researcher = TavilyClient(api_key=tavily_api_key) if tavily_api_key else None             
+        self.line_item_index_path = line_item_index_path
+        # concurrent audits of the same ticker share one in-flight fetch per stage
+        self.flights = SingleFlight()
+        # every period of both statements, fetched once per ticker; concurrent misses share the fetch
+        self.statements = StatementStore(flights=self.flights)
+        self._evaluator = None
+        self._researcher = None
+        self._line_items = None
+        self._noise_lexicon = None
         self.evidence_weights = {
             "FUNDAMENTAL_DATA": 1.0,
             "PEER_CONTEXT": 0.5,
             "MARKET_NOISE": 0.0
         }
 
-    # input classifier
+    # heavy clients (pandas, tavily) are created on first use, not at startup
+    @property
+    def evaluator(self):
+        if self._evaluator is None:
+            from evaluator import FinancialEvaluator
+            self._evaluator = FinancialEvaluator(self.canonical_path)
+        return self._evaluator
+
+    @property
+    def researcher(self):
+        # _researcher = False switches search off even when a key is configured (replays of keyless recordings)
+        if self._researcher is None and self.tavily_api_key:
+            from tavily import TavilyClient
+            self._researcher = TavilyClient(api_key=self.tavily_api_key)
+        return self._researcher or None
+
+    @property
+    def line_items(self):
+        # filed line items from the canonical tables, empty when the index was never built
+        if self._line_items is None:
+            from line_item_index import LineItemIndex
+            self._line_items = LineItemIndex.load(self.line_item_index_path) if self.line_item_index_path else LineItemIndex()
+        return self._line_items
+
+    def lookup_line_items(self, ticker, query, limit=12):
+        # only when the question names a line item ("capex", "D&A") and the ticker is a company we hold filings for
+        items = self.line_items.mentions(query)
+        if not items:
+            return []
+        companies = self.line_items.companies_for_ticker(ticker)
+        years = set(re.findall(r'\b(?:fy\s?)?((?:19|20)\d{2})\b', query.lower()))
+        found = []
+        for company in companies:
+            for item in items:
+                for hit in self.line_items.lookup(item, company=company):
+                    if years and hit["period"] not in years:
+                        continue
+                    found.append(hit)
+                    break
+        return found[:limit]
+
+    @property
+    def noise_lexicon(self):
+        if self._noise_lexicon is None:
+            from noise_lexicon import NoiseLexicon
+            self._noise_lexicon = NoiseLexicon.load()
+        return self._noise_lexicon
+
+    # input classifier (terms, categories and weights live in data/noise_lexicon.json)
     def _epistemic_noise_filter(self, query):
-        speculative_noise = ['buy', 'sell', 'long', 'short', 'reco', 'advice', 'target']
-        sentiment_noise = ['bullish', 'bearish', 'hype', 'undervalued', 'overvalued', 'moon']
-        temporal_noise = ['surge', 'plunge', 'daily', 'news', 'rally', 'correction']
-        
-        all_noise = speculative_noise + sentiment_noise + temporal_noise
-        detected = [word for word in all_noise if word in query.lower()]
-        
-        return {
-            "is_noisy": len(detected) > 0,
-            "noise_elements": detected,
-            "action": "BLOCK_RECO" if any(w in speculative_noise for w in detected) else "IGNORE"
-        }
+        return self.noise_lexicon.report(query)
+
+    def prefetch(self, ticker, cancelled=None):
+        # warm the statement store and sector info for a ticker the bridge expects to audit
+        def warm():
+            self.statements.statements(ticker)
+            if cancelled is None or not cancelled.is_set():
+                self.statements.info(ticker)
+        self.flights.do("prefetch", ticker, warm)
 
     def _get_deep_fundamentals(self, ticker):
         try:
-            t = yf.Ticker(ticker)
-            bs = t.balance_sheet
-            is_stmt = t.income_stmt
-            
-            def extract(df, keys):
-                if df is not None and not df.empty:
-                    df.index = df.index.str.replace(' ', '').str.lower()
-                    search_keys = [k.replace(' ', '').lower() for k in keys]
-                    for k in search_keys:
-                        if k in df.index:
-                            val = df.loc[k]
-                            target = val.iloc[0] if hasattr(val, 'iloc') else val
-                            if isinstance(target, (list, tuple)): target = target[0]
-                            return float(target) if target is not None else 0.0
-                return 0.0
-
+            # latest period of each statement, read from the cached store
             data = {
-                "revenue": extract(is_stmt, ['Total Revenue', 'TotalRevenue']),
-                "net_income": extract(is_stmt, ['Net Income', 'NetIncome']),
-                "total_assets": extract(bs, ['Total Assets', 'TotalAssets']),
-                "ppe_net": extract(bs, ['Net PPE', 'Property Plant Equipment Net', 'Fixed Assets']),
-                "inventory": extract(bs, ['Inventory', 'Stock']),
-                "total_liabilities": extract(bs, ['Total Liabilities Net Minority Interest', 'TotalLiabilities'])
+                key: self.statements.value(ticker, stmt, keys)
+                for key, (stmt, keys) in FUNDAMENTAL_KEYS.items() if key != "equity"
             }
             
-            # Debugging: Print untuk memastikan data tidak nol di terminal
-            print(f"[*] Data Extracted for {ticker}: Rev: {data['revenue']}, Assets: {data['total_assets']}")
+            # record on the active span instead of printing on the hot path
+            tracer.current().set(revenue=data['revenue'], total_assets=data['total_assets'])
             return data
             
         except Exception as e:
-            print(f"[!] Acquisition Error for {ticker}: {e}")
+            tracer.current().record_error(e)
             return {}
 
     def _identify_business_archetype(self, ticker, fundamentals):
@@ -110,17 +156,60 @@ class FinbenchSystem:
         if self.researcher:
             try:
                 # search ROA avg
-                t = yf.Ticker(ticker)
-                sector = t.info.get('sector', 'Technology')
+                sector = self.statements.info(ticker).get('sector', 'Technology')
                 query = f"average ROA and asset turnover for {sector} sector 2025"
                 search = self.researcher.search(query=query, max_results=1)
                 sector_data["search_context"] = search['results'][0]['content'] if search['results'] else ""
                 sector_data["sector_name"] = sector
                 sector_data["status"] = "LIVE_SEARCH_DATA"
-            except: pass
+            except Exception as e:
+                tracer.current().record_error(e)
             
         return sector_data
     
+    def _get_narratives(self, ticker):
+        search = self.researcher.search(query=f"{ticker} structural moat audit", max_results=2)
+        narratives = [{"content": r['content'], "url": r.get('url'), "reliability": self.evidence_weights["PEER_CONTEXT"]} for r in search['results']]
+        # same lexicon over the retrieved text, noisy narratives keep their score for the auditor
+        for n in narratives:
+            noise = self._epistemic_noise_filter(n["content"] or "")
+            n["noise_score"], n["noise_categories"] = noise["noise_score"], noise["categories"]
+        return narratives
+
+    def _get_multi_period_fundamentals(self, ticker):
+        # one row per fiscal period, aligned on period end date across both statements
+        columns = {key: self.statements.series(ticker, stmt, keys) for key, (stmt, keys) in FUNDAMENTAL_KEYS.items()}
+        dates = self.statements.periods(ticker, "income_stmt")
+        rows = []
+        for d in dates:
+            row = {"period": str(d)[:10]}
+            for key, s in columns.items():
+                v = s.get(d) if s is not None else None
+                row[key] = float(v) if v is not None and v == v else 0.0
+            rows.append(row)
+        return rows
+
+    def _calculate_trend_metrics(self, periods):
+        # multi-year DuPont (ROE = margin x turnover x leverage) and YoY growth, newest first
+        trend = []
+        for i, p in enumerate(periods):
+            rev, ni, assets, equity = p["revenue"], p["net_income"], p["total_assets"], p["equity"]
+            row = {"period": p["period"]}
+            if rev > 0 and assets > 0:
+                row["net_profit_margin"] = round((ni / rev) * 100, 2)
+                row["asset_turnover"] = round(rev / assets, 2)
+                row["return_on_assets"] = round((ni / assets) * 100, 2)
+            if equity > 0 and assets > 0:
+                row["equity_multiplier"] = round(assets / equity, 2)
+                row["return_on_equity"] = round((ni / equity) * 100, 2)
+            if i + 1 < len(periods):
+                prev = periods[i + 1]
+                for key in ("revenue", "net_income", "total_assets"):
+                    if prev[key]:
+                        row[f"{key}_yoy_pct"] = round((p[key] - prev[key]) / abs(prev[key]) * 100, 2)
+            trend.append(row)
+        return trend
+
     def _calculate_normalization_stress_test(self, mechanical_audit, benchmarks):
         reported_roa = mechanical_audit.get("roa", 0)
         current_intensity = mechanical_audit.get("capital_intensity", 0)
@@ -140,19 +229,47 @@ class FinbenchSystem:
         }
 
     def run(self, ticker, query=""):
+        with tracer.span("engine.run", ticker=ticker):
+            return self._run_stages(ticker, query)
+
+    def _run_stages(self, ticker, query):
         # running noise filter
-        noise_audit = self._epistemic_noise_filter(query)
+        with tracer.span("engine.noise_filter") as sp:
+            noise_audit = self._epistemic_noise_filter(query)
+            sp.set(is_noisy=noise_audit["is_noisy"], noise_score=noise_audit["noise_score"])
         
         # Data Acquisition
-        raw_fund = self._get_deep_fundamentals(ticker)
+        with tracer.span("engine.fundamentals", ticker=ticker) as sp:
+            raw_fund, coalesced = self.flights.do("fundamentals", ticker, lambda: self._get_deep_fundamentals(ticker))
+            sp.set(coalesced=coalesced)
         if not raw_fund or raw_fund.get("total_assets", 0) == 0:
+            tracer.current().set(blocked=True)
             return {"error": f"Data Insufficient for {ticker}. Epistemic Block active."}
 
         # Analyze structure
-        archetype = self._identify_business_archetype(ticker, raw_fund)
-        metrics = self._calculate_sovereign_metrics(raw_fund, archetype)
-        benchmarks = self._get_sector_benchmarks(ticker)
-        denom_audit = self._audit_denominator_integrity(raw_fund)
+        with tracer.span("engine.metrics"):
+            archetype = self._identify_business_archetype(ticker, raw_fund)
+            metrics = self._calculate_sovereign_metrics(raw_fund, archetype)
+        with tracer.span("engine.benchmarks", ticker=ticker) as sp:
+            benchmarks, coalesced = self.flights.do("benchmarks", ticker, lambda: self._get_sector_benchmarks(ticker))
+            sp.set(data_status=benchmarks["status"], coalesced=coalesced)
+        with tracer.span("engine.denominator_audit"):
+            denom_audit = self._audit_denominator_integrity(raw_fund)
+        with tracer.span("engine.trend") as sp:
+            # served from the statement store, no extra network calls
+            try:
+                trend = self._calculate_trend_metrics(self._get_multi_period_fundamentals(ticker))
+            except Exception as e:
+                sp.record_error(e)
+                trend = []
+            sp.set(periods=len(trend))
+        with tracer.span("engine.line_items") as sp:
+            try:
+                line_items = self.lookup_line_items(ticker, query)
+            except Exception as e:
+                sp.record_error(e)
+                line_items = []
+            sp.set(hits=len(line_items))
 
         # Governance & Decision Perimeter
         governance = {
@@ -170,16 +287,20 @@ class FinbenchSystem:
         # Search Context only if funadmental is clean
         narratives = []
         if self.researcher:
-            try:
-                search = self.researcher.search(query=f"{ticker} structural moat audit", max_results=2)
-                narratives = [{"content": r['content'], "url": r.get('url'), "reliability": self.evidence_weights["PEER_CONTEXT"]} for r in search['results']]
-            except: pass
+            with tracer.span("engine.narratives", ticker=ticker) as sp:
+                try:
+                    narratives, coalesced = self.flights.do("narratives", ticker, lambda: self._get_narratives(ticker))
+                    sp.set(coalesced=coalesced)
+                except Exception as e:
+                    sp.record_error(e)
+                sp.set(results=len(narratives))
         
-        mechanical_audit = {
-            "roa": metrics.get("return_on_assets", 0),
-            "capital_intensity": metrics.get("capital_intensity_ratio", 0)
-        }
-        stress_test_results = self._calculate_normalization_stress_test(mechanical_audit, benchmarks)
+        with tracer.span("engine.stress_test"):
+            mechanical_audit = {
+                "roa": metrics.get("return_on_assets", 0),
+                "capital_intensity": metrics.get("capital_intensity_ratio", 0)
+            }
+            stress_test_results = self._calculate_normalization_stress_test(mechanical_audit, benchmarks)
 
         return {
             "temporal": {"analysis_date": datetime.now().strftime("%Y-%m-%d")},
@@ -193,6 +314,8 @@ class FinbenchSystem:
             "stress_test": stress_test_results,
             "raw_data_summary": raw_fund,
             "denominator_audit": denom_audit,
+            "trend_analysis": trend,
+            "line_items": line_items,
             "benchmarks": benchmarks,
             "governance": governance,
             "context_noise": narratives
@@ -0,0 +1,41 @@
+import json
+import urllib.request
+import urllib.error
+
+
+class AuditServiceClient:
+    """
+    Drop-in replacement for SovereignLlamaBridge.smart_query that forwards
+    the audit to the headless service (src/audit_service.py).
+    """
+    def __init__(self, base_url, config=None, timeout_s=180):
+        self.base_url = base_url.rstrip("/")
+        self.config = config or {"DEBUG_PANEL": False}
+        self.timeout_s = timeout_s
+
+    def _post(self, path, payload):
+        req = urllib.request.Request(
+            self.base_url + path,
+            data=json.dumps(payload).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST"
+        )
+        with urllib.request.urlopen(req, timeout=self.timeout_s) as resp:
+            return json.loads(resp.read().decode("utf-8"))
+
+    def smart_query(self, user_query: str, active_ticker: str = None) -> dict:
+        try:
+            return self._post("/audit", {"query": user_query, "active_ticker": active_ticker})
+        except urllib.error.HTTPError as e:
+            if e.code == 503:
+                return {"answer": "⚠️ **SERVICE BUSY**: all audit workers are occupied, please retry in a moment.", "sources": [], "roa": "N/A"}
+            return {"answer": f"[SERVICE_ERROR] HTTP {e.code}: {e.reason}", "sources": [], "roa": "N/A"}
+        except Exception as e:
+            return {"answer": f"[SERVICE_ERROR] {str(e)}", "sources": [], "roa": "N/A"}
+
+    def batch_query(self, queries: list) -> list:
+        return self._post("/audit/batch", {"queries": queries})["results"]
+
+    def metrics(self) -> dict:
+        with urllib.request.urlopen(self.base_url + "/metrics", timeout=10) as resp:
+            return json.loads(resp.read().decode("utf-8"))
@@ -0,0 +1,102 @@
+import os
+import json
+import sqlite3
+import threading
+from datetime import datetime
+
+
+class AuditHistoryStore:
+    """
+    SQLite-backed audit transcript, one row per message and keyed by session.
+    Answers, sources and the metric snapshot are stored as produced, so
+    reopening an old audit only reads rows and never re-runs the pipeline.
+    Every message carries the owner (one id per browser) of its session;
+    sessions are only listed to, and reopened by, their owner.
+    """
+    def __init__(self, db_path="data/database/audit_history.sqlite3"):
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        # one connection shared by streamlit's script threads, serialized by a lock
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS audit_messages (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_id TEXT NOT NULL,
+                    role TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    sources TEXT,
+                    metrics TEXT,
+                    created_at TEXT NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_audit_session ON audit_messages (session_id, id)")
+            # databases from before sessions had owners: their rows stay, owned by nobody
+            columns = {r["name"] for r in self._conn.execute("PRAGMA table_info(audit_messages)")}
+            if "owner" not in columns:
+                self._conn.execute("ALTER TABLE audit_messages ADD COLUMN owner TEXT")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_audit_owner ON audit_messages (owner, id)")
+
+    def _to_dict(self, row):
+        return {
+            "id": row["id"],
+            "role": row["role"],
+            "content": row["content"],
+            "sources": json.loads(row["sources"]) if row["sources"] else [],
+            "metrics": json.loads(row["metrics"]) if row["metrics"] else {},
+            "created_at": row["created_at"]
+        }
+
+    def append(self, session_id, role, content, sources=None, metrics=None, owner=None):
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                "INSERT INTO audit_messages (session_id, role, content, sources, metrics, created_at, owner) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (session_id, role, content, json.dumps(sources or []), json.dumps(metrics or {}, default=str),
+                 datetime.now().isoformat(), owner)
+            )
+            return cur.lastrowid
+
+    def owned_by(self, session_id, owner):
+        # True for a session with no messages yet, otherwise only for the owner of its first message
+        with self._lock:
+            row = self._conn.execute("SELECT owner FROM audit_messages WHERE session_id = ? ORDER BY id LIMIT 1",
+                                     (session_id,)).fetchone()
+        return row is None or (owner is not None and row["owner"] == owner)
+
+    def count(self, session_id):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM audit_messages WHERE session_id = ?", (session_id,)).fetchone()[0]
+
+    def recent(self, session_id, limit, before_id=None):
+        # newest `limit` messages (optionally older than before_id), returned oldest first
+        query = "SELECT * FROM audit_messages WHERE session_id = ?"
+        params = [session_id]
+        if before_id is not None:
+            query += " AND id < ?"
+            params.append(before_id)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [self._to_dict(r) for r in reversed(rows)]
+
+    def sessions(self, owner, limit=20):
+        # the owner's most recently active sessions first, titled by their first question
+        with self._lock:
+            rows = self._conn.execute("""
+                SELECT s.session_id, s.n, s.first_at, s.last_at,
+                       (SELECT content FROM audit_messages m WHERE m.session_id = s.session_id AND m.role = 'user'
+                        ORDER BY m.id LIMIT 1) AS title
+                FROM (SELECT session_id, COUNT(*) AS n, MIN(created_at) AS first_at, MAX(created_at) AS last_at, MAX(id) AS last_id
+                      FROM audit_messages WHERE owner = ? GROUP BY session_id) s
+                ORDER BY s.last_id DESC LIMIT ?
+            """, (owner, limit)).fetchall()
+        return [{"session_id": r["session_id"], "messages": r["n"], "started_at": r["first_at"],
+                 "last_at": r["last_at"], "title": r["title"] or ""} for r in rows]
+
+    def get(self, message_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM audit_messages WHERE id = ?", (message_id,)).fetchone()
+        return self._to_dict(row) if row else None
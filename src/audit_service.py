@@ -0,0 +1,207 @@
+import time
+import random
+import asyncio
+import argparse
+import functools
+from typing import Optional
+from collections import deque
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+class PoolSaturated(Exception):
+    pass
+
+
+class AuditWorkerPool:
+    """
+    Bounded pool that runs the synchronous bridge off the event loop.
+    Requests wait in a fixed-size queue; when it is full, submit() fails
+    fast with PoolSaturated so the caller can shed load instead of piling up.
+    """
+    def __init__(self, handler, workers=4, queue_size=32):
+        self.handler = handler
+        self.workers = workers
+        self.queue_size = queue_size
+        self.queue = None
+        self._tasks = []
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="audit-worker")
+        self._latencies = deque(maxlen=1000)
+        self.counters = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0, "expired": 0, "in_flight": 0, "peak_queue_depth": 0}
+
+    async def start(self):
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def free_slots(self):
+        return self.queue.maxsize - self.queue.qsize()
+
+    def submit(self, query, **kwargs):
+        fut = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((query, kwargs, fut, time.perf_counter()))
+        except asyncio.QueueFull:
+            self.counters["rejected"] += 1
+            raise PoolSaturated(f"audit queue full ({self.queue_size} pending)")
+        self.counters["submitted"] += 1
+        self.counters["peak_queue_depth"] = max(self.counters["peak_queue_depth"], self.queue.qsize())
+        return fut
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            query, kwargs, fut, enqueued = await self.queue.get()
+            # the caller timed out (wait_for cancels the future) or went away while this sat in the queue
+            if fut.done():
+                self.counters["expired"] += 1
+                self.queue.task_done()
+                continue
+            self.counters["in_flight"] += 1
+            try:
+                result = await loop.run_in_executor(self._executor, functools.partial(self.handler, query, **kwargs))
+                self.counters["completed"] += 1
+                if not fut.done():
+                    fut.set_result(result)
+            except Exception as e:
+                self.counters["failed"] += 1
+                if not fut.done():
+                    fut.set_exception(e)
+            finally:
+                self.counters["in_flight"] -= 1
+                self._latencies.append(time.perf_counter() - enqueued)
+                self.queue.task_done()
+
+    def metrics(self):
+        lat = sorted(self._latencies)
+        def pct(p):
+            return round(lat[min(len(lat) - 1, int(p * len(lat)))] * 1000, 1) if lat else None
+        return {
+            "workers": self.workers,
+            "queue_depth": self.queue.qsize() if self.queue else 0,
+            "queue_capacity": self.queue_size,
+            **self.counters,
+            "latency_ms": {"p50": pct(0.50), "p95": pct(0.95), "p99": pct(0.99)}
+        }
+
+
+class AuditRequest(BaseModel):
+    query: str
+    # ticker the session was last auditing, used as a prefetch hint
+    active_ticker: Optional[str] = None
+
+
+class BatchAuditRequest(BaseModel):
+    queries: list[str]
+
+
+class StubBridge:
+    """stand-in for SovereignLlamaBridge so the service can be load tested offline"""
+    def __init__(self, latency_s=0.5, jitter_s=0.2, error_rate=0.0):
+        self.latency_s = latency_s
+        self.jitter_s = jitter_s
+        self.error_rate = error_rate
+        self.config = {"DEBUG_PANEL": False}
+
+    def smart_query(self, user_query: str, active_ticker: str = None) -> dict:
+        time.sleep(max(0.0, self.latency_s + random.uniform(-self.jitter_s, self.jitter_s)))
+        if random.random() < self.error_rate:
+            return {"answer": "⚠️ **PRECISION LOCK**: stubbed rate limit.", "sources": [], "roa": "N/A"}
+        return {"ticker": "STUB", "answer": f"[STUB_AUDIT] {user_query[-80:]}", "sources": [], "roa": "10.0%",
+                "turnover": 0.7, "margin": "14.3%", "ppe_ratio": 0.2}
+
+
+def create_app(bridge, workers=4, queue_size=32, max_batch=16, request_timeout_s=180):
+    pool = AuditWorkerPool(bridge.smart_query, workers=workers, queue_size=queue_size)
+
+    @asynccontextmanager
+    async def lifespan(app):
+        await pool.start()
+        yield
+        await pool.stop()
+
+    app = FastAPI(title="Finance Auditor LLM service", lifespan=lifespan)
+    app.state.pool = pool
+
+    def busy(detail):
+        return JSONResponse(status_code=503, content={"detail": detail, "metrics": pool.metrics()}, headers={"Retry-After": "2"})
+
+    async def wait(fut):
+        try:
+            return await asyncio.wait_for(fut, timeout=request_timeout_s)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail="audit timed out")
+
+    @app.post("/audit")
+    async def audit(req: AuditRequest):
+        try:
+            fut = pool.submit(req.query, active_ticker=req.active_ticker)
+        except PoolSaturated as e:
+            return busy(str(e))
+        return await wait(fut)
+
+    @app.post("/audit/batch")
+    async def audit_batch(req: BatchAuditRequest):
+        if len(req.queries) > max_batch:
+            raise HTTPException(status_code=413, detail=f"batch larger than {max_batch}")
+        # all-or-nothing admission so a batch never half-fills the queue
+        if len(req.queries) > pool.free_slots():
+            pool.counters["rejected"] += len(req.queries)
+            return busy(f"not enough queue capacity for {len(req.queries)} audits")
+        futures = [pool.submit(q) for q in req.queries]
+        results = await asyncio.gather(*(wait(f) for f in futures), return_exceptions=True)
+        return {"results": [r if not isinstance(r, Exception) else {"answer": f"[SERVICE_ERROR] {r}", "sources": [], "roa": "N/A"} for r in results]}
+
+    @app.get("/metrics")
+    async def metrics():
+        data = pool.metrics()
+        flights = getattr(bridge, "flights", None)
+        if flights is not None:
+            data["single_flight"] = flights.snapshot()
+        if hasattr(bridge, "prefetch_report"):
+            data["prefetch"] = bridge.prefetch_report()
+        return data
+
+    @app.get("/healthz")
+    async def healthz():
+        return {"status": "ok"}
+
+    return app
+
+
+def build_bridge():
+    from bridge_llama import SovereignLlamaBridge, resolve_config
+    from agent_system import FinbenchSystem
+    config = resolve_config()
+    engine = FinbenchSystem(canonical_path=config["CANONICAL_PATH"], tavily_api_key=config["TAVILY_API_KEY"],
+                            line_item_index_path=config["LINE_ITEM_INDEX_PATH"])
+    return SovereignLlamaBridge(engine, config=config)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="headless audit service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--queue", type=int, default=32)
+    parser.add_argument("--stub", action="store_true", help="serve a latency stub instead of the real bridge")
+    parser.add_argument("--stub-latency", type=float, default=0.5)
+    parser.add_argument("--stub-error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    bridge = StubBridge(args.stub_latency, error_rate=args.stub_error_rate) if args.stub else build_bridge()
+    import uvicorn
+    uvicorn.run(create_app(bridge, workers=args.workers, queue_size=args.queue), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,101 @@
 import os
 import json
 import re
-import streamlit as st
+import time
+import hashlib
+import threading
 from datetime import datetime
-from groq import Groq
 from agent_system import FinbenchSystem
-from sovereign_prompt import llama_prompt_constitution
+from tracing import tracer
+from prompt_budget import PromptBuilder, TokenBudget, count_tokens, truncate_head
 
+# static defaults only, secrets are resolved on demand by resolve_config()
 DEFAULT_CONFIG = {
-    "GROQ_API_KEY": st.secrets["GROQ_API_KEY"],
-    "TAVILY_API_KEY": st.secrets["TAVILY_API_KEY"],
     "MODEL_NAME": "llama-3.3-70b-versatile",
-    "CANONICAL_PATH": r"data/results/evaluations"
+    "CANONICAL_PATH": r"data/results/evaluations",
+    "DEBUG_PANEL": False,
+    "HISTORY_DB_PATH": r"data/database/audit_history.sqlite3",
+    "LINE_ITEM_INDEX_PATH": r"data/processed/canonical/line_item_index.json",
+    # token budgets sized against the provider's per-model limits
+    "MAX_PROMPT_TOKENS": 6000,
+    "TOKENS_PER_MINUTE": 12000,
+    "COMPLETION_RESERVE_TOKENS": 1024,
+    "RESOLVER_MAX_TOKENS": 512
 }
+SECRET_KEYS = ("GROQ_API_KEY", "TAVILY_API_KEY")
+
+# company names the prefetcher can map to a ticker without waiting for the resolver
+KNOWN_TICKERS = {
+    "apple": "AAPL", "nvidia": "NVDA", "microsoft": "MSFT", "amazon": "AMZN", "alphabet": "GOOGL", "google": "GOOGL",
+    "meta": "META", "facebook": "META", "tesla": "TSLA", "netflix": "NFLX", "intel": "INTC", "oracle": "ORCL",
+    "adobe": "ADBE", "salesforce": "CRM", "paypal": "PYPL", "3m": "MMM", "boeing": "BA", "lockheed martin": "LMT",
+    "coca cola": "KO", "coca-cola": "KO", "pepsico": "PEP", "walmart": "WMT", "costco": "COST", "best buy": "BBY",
+    "nike": "NKE", "mcdonalds": "MCD", "mcdonald's": "MCD", "johnson & johnson": "JNJ", "pfizer": "PFE",
+    "jpmorgan": "JPM", "american express": "AXP", "verizon": "VZ", "general mills": "GIS", "amcor": "AMCR",
+    "activision blizzard": "ATVI", "kraft heinz": "KHC", "ulta beauty": "ULTA", "amd": "AMD", "corning": "GLW",
+    "cvs health": "CVS", "foot locker": "FL", "mgm resorts": "MGM", "american water works": "AWK"
+}
+# symbols typed in a question are only guessed when they belong to a known company ("WHAT", "Q4" are not tickers)
+KNOWN_SYMBOLS = set(KNOWN_TICKERS.values())
+
+def _read_secret(key):
+    # streamlit is only touched when the key is not in the environment
+    try:
+        import streamlit as st
+        return st.secrets[key]
+    except Exception:
+        return None
+
+def resolve_config(overrides=None) -> dict:
+    config = dict(DEFAULT_CONFIG)
+    for key in SECRET_KEYS:
+        config[key] = os.environ.get(key) or _read_secret(key)
+    config["DEBUG_PANEL"] = os.environ.get("AUDIT_DEBUG_PANEL", "0") == "1"
+    # when set, the UI forwards audits to the headless service instead of running them in-process
+    config["AUDIT_SERVICE_URL"] = os.environ.get("AUDIT_SERVICE_URL")
+    config["HISTORY_DB_PATH"] = os.environ.get("HISTORY_DB_PATH") or _read_secret("HISTORY_DB_PATH") or config["HISTORY_DB_PATH"]
+    config.update(overrides or {})
+    return config
+
+def load_constitution() -> str:
+    # the governance prompt lives outside the public tree, load it on first query
+    try:
+        from sovereign_prompt import llama_prompt_constitution
+    except ImportError as e:
+        raise RuntimeError("sovereign_prompt.llama_prompt_constitution is missing; add src/sovereign_prompt.py") from e
+    return llama_prompt_constitution
 
 class SovereignLlamaBridge:
-    def __init__(self, engine: FinbenchSystem):
+    def __init__(self, engine: FinbenchSystem, config: dict = None):
         self.engine = engine
-        self.client = Groq(api_key=DEFAULT_CONFIG["GROQ_API_KEY"])
-        self.model = DEFAULT_CONFIG["MODEL_NAME"]
+        self.config = config or resolve_config()
+        self.model = self.config["MODEL_NAME"]
+        self._client = None
+        self.token_budget = TokenBudget(self.config["TOKENS_PER_MINUTE"])
+        # identical prompts in flight at once share one completion (counters live with the engine's stages)
+        self.flights = engine.flights
+        # fundamentals fetched speculatively while the resolver call is in flight
+        self._prefetch_pool = None
+        self._prefetch_lock = threading.Lock()
+        self.prefetch_stats = {"speculated": 0, "hits": 0, "misses": 0, "cancelled": 0, "queued": 0, "errors": 0, "saved_ms": 0.0}
+
+    @property
+    def client(self):
+        # groq client (and its httpx stack) is built on the first LLM call
+        if self._client is None:
+            from groq import Groq
+            self._client = Groq(api_key=self.config["GROQ_API_KEY"])
+        return self._client
 
     def _resolve_ticker_automatically(self, user_query: str) -> str:
+        with tracer.span("bridge.resolve_ticker", model="llama-3.1-8b-instant") as sp:
+            ticker = self._resolve_ticker(user_query)
+            sp.set(ticker=ticker)
+            return ticker
+
+    def _resolve_ticker(self, user_query: str) -> str:
+        # the resolver only needs the latest turns, not the whole transcript
+        user_query = truncate_head(user_query, self.config["RESOLVER_MAX_TOKENS"])
         resolver_prompt = f"""
         Identify the stock ticker symbol for the company mentioned in this query: "{user_query}"
         Rules:
@@ -34,13 +109,27 @@ class SovereignLlamaBridge:
                 messages=[{"role": "user", "content": resolver_prompt}],
                 temperature=0.0
             )
+            _record_usage(completion)
             ticker = completion.choices[0].message.content.strip().upper()
             ticker = re.sub(r'[^A-Z]', '', ticker) 
             return None if "NONE" in ticker or not ticker else ticker
-        except:
+        except Exception as e:
+            tracer.current().record_error(e)
             return None
 
-    def _execute_inference(self, messages: list) -> str:
+    def _execute_inference(self, messages: list, prompt_tokens: int = 0) -> tuple:
+        with tracer.span("bridge.inference", model=self.model, prompt_tokens_est=prompt_tokens) as sp:
+            key = hashlib.sha1(json.dumps([self.model, messages], sort_keys=True).encode("utf-8")).hexdigest()
+            result, coalesced = self.flights.do("inference", key, lambda: self._run_inference(messages, prompt_tokens, sp))
+            sp.set(coalesced=coalesced)
+            return result
+
+    def _run_inference(self, messages: list, prompt_tokens: int, sp) -> tuple:
+        reservation = self.token_budget.reserve(prompt_tokens + self.config["COMPLETION_RESERVE_TOKENS"])
+        if reservation is None:
+            # local 429: don't spend a request the provider would reject anyway
+            sp.set(rate_limited=True, budget_blocked=True)
+            return PRECISION_LOCK_MSG, {}
         try:
             completion = self.client.chat.completions.create(
                 model=self.model,
@@ -48,12 +137,44 @@ class SovereignLlamaBridge:
                 temperature=0.1,
                 top_p=0.9
             )
-            return completion.choices[0].message.content
+            usage = _record_usage(completion)
+            self.token_budget.settle(reservation, usage.get("total_tokens"))
+            return completion.choices[0].message.content, usage
         except Exception as e:
+            sp.record_error(e)
             error_msg = str(e).lower()
             if "rate_limit" in error_msg or "429" in error_msg:
-                return "⚠️ **PRECISION LOCK**: High-capacity inference (70B model) is unavailable because the token limit has been reached."
-            return f"[BRIDGE_ERROR] AI Failure: {str(e)}"
+                sp.set(rate_limited=True)
+                return PRECISION_LOCK_MSG, {}
+            self.token_budget.settle(reservation, 0)
+            return f"[BRIDGE_ERROR] AI Failure: {str(e)}", {}
+
+    def _assemble_messages(self, formatted_context: str, noise_warning: str, user_query: str) -> tuple:
+        # only earlier turns give way when the prompt is over budget: the governance prompt, the
+        # anti-hype alert and the audit evidence are never dropped, if they don't fit nothing is sent
+        history, question = _split_conversation(user_query)
+        builder = PromptBuilder()
+        builder.add("constitution", load_constitution(), priority=100, required=True)
+        builder.add("noise_warning", noise_warning, priority=100, required=True)
+        builder.add("audit_context", formatted_context, priority=100, required=True)
+        builder.add("history", history, priority=30, truncatable=True)
+        builder.add("question", question, priority=100, required=True)
+
+        limit = min(self.config["MAX_PROMPT_TOKENS"], self.token_budget.available() - self.config["COMPLETION_RESERVE_TOKENS"])
+        parts, report = builder.build(max(limit, 0))
+        report["minute_window_used"] = self.token_budget.used()
+
+        conversation = f"{parts['history']}\n{parts['question']}" if parts["history"] else parts["question"]
+        # WRAPPING DATA IN THE EXACT TAG THE LLM IS TRAINED TO LOOK FOR
+        messages = [
+            {"role": "system", "content": parts["constitution"] + parts["noise_warning"]},
+            {
+                "role": "user", 
+                "content": f"ANALYSIS_MANDATE: Perform a clinical audit using the data below.\n\n{parts['audit_context']}\n\nUSER_QUESTION: {conversation}"
+            }
+        ]
+        report["prompt_tokens_est"] = sum(count_tokens(m["content"]) for m in messages)
+        return messages, report
         
     def _prepare_audit_context(self, context_data: dict) -> str:
         kb = context_data.get("knowledge_base", {})
@@ -103,11 +224,100 @@ class SovereignLlamaBridge:
         [4. PRIMARY ENGINE VS AMPLIFIER]
         - Primary Driver: {'PRICING_POWER (High Margin)' if implied_margin > 0.15 else 'OPERATIONAL_VELOCITY (High Turnover)'}
         - Amplifier Status: {'ASSET_LIGHT_LEVERAGE' if ppe_ratio < 0.2 else 'INTEGRATED_HEAVY'}
-        """
+        {self._format_trend(context_data.get("trend_analysis", []))}{self._format_line_items(context_data.get("line_items", []))}"""
+
+    def _format_trend(self, trend: list) -> str:
+        if not trend:
+            return ""
+        lines = ["", "        [5. MULTI-YEAR DUPONT TREND (OBSERVED PERIODS)]"]
+        for p in trend:
+            lines.append(
+                f"        - {p['period']}: ROA {p.get('return_on_assets', 'N/A')}% = Margin {p.get('net_profit_margin', 'N/A')}% x AT {p.get('asset_turnover', 'N/A')}"
+                f" | ROE {p.get('return_on_equity', 'N/A')}% (EM {p.get('equity_multiplier', 'N/A')})"
+                f" | Rev YoY {p.get('revenue_yoy_pct', 'N/A')}% | NI YoY {p.get('net_income_yoy_pct', 'N/A')}%"
+            )
+        return "\n".join(lines) + "\n"
+
+    def _format_line_items(self, items: list) -> str:
+        if not items:
+            return ""
+        lines = ["", "        [6. FILED LINE ITEMS (CANONICAL TABLES)]"]
+        for h in items:
+            lines.append(f"        - {h['company']} {h['period'] or 'N/A'} | {h['label']}: {h['value']:,.2f} (source: {h['table']})")
+        return "\n".join(lines) + "\n"
   
-    def smart_query(self, user_query: str) -> dict:
+    def _start_prefetch(self, user_query: str, active_ticker: str = None) -> dict:
+        candidates = [t for t in _candidate_tickers(user_query, active_ticker) if not self.engine.statements.is_cached(t)]
+        tracer.current().set(prefetch_candidates=candidates)
+        if not candidates:
+            return {}
+        if self._prefetch_pool is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self._prefetch_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="prefetch")
+
+        def run(ticker, cancelled):
+            self.engine.prefetch(ticker, cancelled)
+            return time.perf_counter()
+
+        started = time.perf_counter()
+        pending = {}
+        for t in candidates:
+            cancelled = threading.Event()
+            pending[t] = (self._prefetch_pool.submit(run, t, cancelled), cancelled, started)
+        return pending
+
+    def _settle_prefetch(self, pending: dict, ticker: str):
+        # adopt the prefetch that matches the resolved ticker, cancel the rest
+        if not pending:
+            return
+        resolved_at = time.perf_counter()
+        stats = {"speculated": 1, "hits": 0, "misses": 0, "cancelled": 0, "queued": 0, "errors": 0, "saved_ms": 0.0}
+        for t, (fut, cancelled, started) in pending.items():
+            if t == ticker:
+                continue
+            cancelled.set()
+            if fut.cancel():
+                stats["cancelled"] += 1
+        adopted = pending.get(ticker)
+        if adopted is None:
+            stats["misses"] += 1
+        elif adopted[0].cancel():
+            # right guess but still queued behind other sessions' prefetches, the engine fetches it itself
+            stats["queued"] += 1
+        else:
+            fut, _, started = adopted
+            try:
+                finished_at = fut.result()
+                stats["hits"] += 1
+                # the part of the fetch that overlapped the resolver call
+                stats["saved_ms"] = round((min(finished_at, resolved_at) - started) * 1000, 1)
+            except Exception as e:
+                tracer.current().record_error(e)
+                stats["errors"] += 1
+        tracer.current().set(prefetch_hit=bool(stats["hits"]), prefetch_saved_ms=stats["saved_ms"])
+        with self._prefetch_lock:
+            for k, v in stats.items():
+                self.prefetch_stats[k] += v
+
+    def prefetch_report(self) -> dict:
+        with self._prefetch_lock:
+            report = dict(self.prefetch_stats)
+        report["hit_rate"] = round(report["hits"] / report["speculated"], 3) if report["speculated"] else None
+        report["saved_ms"] = round(report["saved_ms"], 1)
+        return report
+
+    def smart_query(self, user_query: str, active_ticker: str = None) -> dict:
+        with tracer.span("bridge.smart_query", query_chars=len(user_query)) as sp:
+            result = self._smart_query(user_query, active_ticker)
+            sp.set(roa=result.get("roa"))
+            return result
+
+    def _smart_query(self, user_query: str, active_ticker: str = None) -> dict:
         try:
+            # statements for likely tickers load while the 8B resolver is still answering
+            pending = self._start_prefetch(user_query, active_ticker)
             ticker = self._resolve_ticker_automatically(user_query)
+            self._settle_prefetch(pending, ticker)
             
             if not ticker:
                 return {
@@ -115,46 +325,84 @@ class SovereignLlamaBridge:
                     "sources": [], "roa": "N/A"
                 }
 
-            context_data = self.engine.run(ticker, query=user_query)
+            # only the live question: earlier answers in the transcript must not feed the noise filter or line-item lookup
+            _, question = _split_conversation(user_query)
+            context_data = self.engine.run(ticker, query=question)
             if "error" in context_data:
                 return {"answer": context_data["error"], "sources": [], "roa": "N/A"}
 
             formatted_context = self._prepare_audit_context(context_data)
             
-            # LOGGING FOR AUDITOR VERIFICATION
-            print(f"--- [SOVEREIGN DEBUG: {ticker}] ---")
-            print(formatted_context)
-            print("-----------------------------------")
+            # LOGGING FOR AUDITOR VERIFICATION (kept on the trace, not stdout)
+            tracer.current().set(ticker=ticker, audit_context=formatted_context)
 
             noise_report = context_data.get("governance", {}).get("noise_filter_report", {})
             noise_warning = ""
             if noise_report.get("is_noisy"):
                 noise_warning = f"\nSYSTEM_ALERT: Market noise detected ({noise_report.get('noise_elements')}). Filter active."
 
-            # WRAPPING DATA IN THE EXACT TAG THE LLM IS TRAINED TO LOOK FOR
-            messages = [
-                {"role": "system", "content": llama_prompt_constitution + noise_warning},
-                {
-                    "role": "user", 
-                    "content": f"ANALYSIS_MANDATE: Perform a clinical audit using the data below.\n\n{formatted_context}\n\nUSER_QUESTION: {user_query}"
-                }
-            ]
-            
-            ai_answer = self._execute_inference(messages)
+            messages, usage = self._assemble_messages(formatted_context, noise_warning, user_query)
+            tracer.current().set(prompt_sections=usage["sections"], dropped=usage["dropped"], truncated=usage["truncated"])
+            if not usage["fits"]:
+                # the required parts alone exceed the prompt limit or what is left of the minute window
+                tracer.current().set(rate_limited=True, budget_blocked=True)
+                return {"ticker": ticker, "answer": PRECISION_LOCK_MSG, "sources": [], "roa": "N/A", "usage": usage}
+
+            ai_answer, provider_usage = self._execute_inference(messages, usage["prompt_tokens_est"])
+            usage["provider"] = provider_usage
             
             # Response formatting logic
             audit_res = context_data.get("sovereign_metrics", {})
             denom_res = context_data.get("denominator_audit", {})
             
             return {
+                "ticker": ticker,
                 "answer": ai_answer,
                 "sources": [n.get("url") for n in context_data.get("context_noise", []) if n.get("url")],
                 "roa": f"{audit_res.get('return_on_assets', 'N/A')}%",
                 "turnover": audit_res.get("asset_turnover", "N/A"),
                 "margin": f"{audit_res.get('net_profit_margin', 'N/A')}%",
-                "ppe_ratio": denom_res.get("ppe_to_assets", "N/A")
+                "ppe_ratio": denom_res.get("ppe_to_assets", "N/A"),
+                "usage": usage
             }
 
         except Exception as e:
+            tracer.current().record_error(e)
             return {"answer": f"⚠️ **INTERNAL_SYSTEM_ERROR**: {str(e)}", "sources": [], "roa": "N/A"}
+
+
+PRECISION_LOCK_MSG = "⚠️ **PRECISION LOCK**: High-capacity inference (70B model) is unavailable because the token limit has been reached."
+
+
+def _candidate_tickers(user_query, active_ticker=None, limit=3):
+    # cheap local guesses at the resolver's answer: explicit symbols, known names, then the ticker in focus
+    _, question = _split_conversation(user_query)
+    found = [t for t in re.findall(r'\b[A-Z]{1,5}\b', question) if t in KNOWN_SYMBOLS]
+    low = question.lower()
+    found += [t for name, t in KNOWN_TICKERS.items() if re.search(r'(?<![\w])' + re.escape(name) + r'(?![\w])', low)]
+    if active_ticker:
+        found.append(active_ticker)
+    return list(dict.fromkeys(found))[:limit]
+
+
+def _split_conversation(user_query):
+    # app.py sends "ROLE: text" lines, the last USER turn is the live question
+    idx = user_query.rfind("USER: ")
+    if idx <= 0:
+        return "", user_query
+    return user_query[:idx].rstrip("\n"), user_query[idx:]
+
+
+def _record_usage(completion):
+    # token counts reported by the provider, attached to the active span
+    usage = getattr(completion, "usage", None)
+    if usage is None:
+        return {}
+    counts = {
+        "prompt_tokens": getattr(usage, "prompt_tokens", None),
+        "completion_tokens": getattr(usage, "completion_tokens", None),
+        "total_tokens": getattr(usage, "total_tokens", None)
+    }
+    tracer.current().set(**counts)
+    return counts
     
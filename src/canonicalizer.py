@@ -4,7 +4,10 @@ import re
 import io
 import json
 import os
+import time
 from pathlib import Path
+from table_dedup import TableDeduplicator
+from line_item_index import LineItemIndex, LINE_ITEMS_FILE
 
 class FinancialCanonicalizer:
     def __init__(self):
@@ -12,6 +15,16 @@ class FinancialCanonicalizer:
         self.clean_regex = re.compile(r'[^\d\.\(\)\-]')
         # emergency keywords for financial tabels detection
         self.emergency_keywords = ['revenue', 'income', 'asset', 'profit', 'loss', 'cash', 'tax', 'sales', 'operating', 'net', 'ebitda']
+        self.null_tokens = {'-', '', '_', 'none', 'þ', '¨', 'n/a', 'nil', '.'}
+        self.time_regex = re.compile(r'(201\d|202\d|q[1-4]|fiscal|year|ended)')
+        self.digit_regex = re.compile(r'\d')
+        # accept/reject mix of the fast path, reset per run by the caller if needed
+        self.stats = {"tables": 0, "accepted": 0, "rejected_shape": 0, "rejected_quality": 0, "scan_s": 0.0, "write_s": 0.0,
+                      "duplicates": 0, "near_duplicates": 0, "bytes_saved": 0}
+        # content-hash registry, persisted with load/save_table_refs across runs
+        self.dedup = TableDeduplicator()
+        # row label -> cells, written next to the csv files for direct line-item lookup
+        self.line_items = LineItemIndex()
 
     def clean_cell(self, val):
         # handling nan values
@@ -30,7 +43,7 @@ class FinancialCanonicalizer:
 
         # Teks Normalization
         s = str(val).strip().lower()
-        if s in ['-', '', '_', 'none', 'þ', '¨', 'n/a', 'nil', '.']: 
+        if s in self.null_tokens: 
             return 0.0
         
         # percentage detection
@@ -63,7 +76,7 @@ class FinancialCanonicalizer:
         full_context = header_context + " " + top_rows_context
 
         # years detection
-        has_time = bool(re.search(r'(201\d|202\d|q[1-4]|fiscal|year|ended)', full_context))
+        has_time = bool(self.time_regex.search(full_context))
 
         # count number density
         def check_num(x):
@@ -100,6 +113,113 @@ class FinancialCanonicalizer:
         df.columns = [str(c).strip() if c else f"Col_{i}" for i, c in enumerate(df.iloc[0])]
         return df.iloc[1:].reset_index(drop=True)
 
+    def clean_raw_cell(self, cell):
+        # clean_cell for a raw markdown string: a cell without any digit can
+        # never become a number, so skip the regex + float() attempt for it
+        if not self.digit_regex.search(cell):
+            return 0.0 if cell.lower() in self.null_tokens else cell
+        return self.clean_cell(cell)
+
+    def scan_markdown_table(self, md_content):
+        # streaming equivalent of parse_markdown_table + df.map(clean_cell),
+        # returns (columns, rows) as plain lists without building a DataFrame
+        columns = None
+        rows = []
+        width = 0
+        for line in md_content.strip().split('\n'):
+            if '|' not in line:
+                continue
+            cells = [c.strip() for c in line.strip().strip('|').split('|')]
+            # ignor separator row
+            if all(set(c) <= {'-', ':', ' '} for c in cells):
+                continue
+            width = max(width, len(cells))
+            if columns is None:
+                columns = cells
+            else:
+                rows.append([self.clean_raw_cell(c) for c in cells])
+
+        if not rows: return None
+
+        # ragged rows are padded like pd.DataFrame does (None -> clean_cell -> 0.0)
+        columns = [columns[i] if i < len(columns) and columns[i] else f"Col_{i}" for i in range(width)]
+        for row in rows:
+            if len(row) < width:
+                row.extend([0.0] * (width - len(row)))
+        return columns, rows
+
+    def is_high_quality_rows(self, columns, rows):
+        # same signals and thresholds as is_high_quality, computed on scanned rows
+        width = len(columns)
+        if not rows or width < 2:
+            return False
+
+        header_context = " ".join(columns).lower()
+        top_rows_context = " ".join(str(v) for row in rows[:3] for v in row).lower()
+        full_context = header_context + " " + top_rows_context
+
+        has_time = bool(self.time_regex.search(full_context))
+        has_fin = any(kw in full_context for kw in self.emergency_keywords)
+
+        num_count = sum(1 for row in rows for v in row if isinstance(v, float) and v != 0.0)
+        density = num_count / (len(rows) * width)
+
+        if has_time and density > 0.02: return True
+        if has_fin and density > 0.05: return True
+        if density > 0.2: return True
+
+        return False
+
+    def rows_to_frame(self, columns, rows):
+        # accepted tables go straight into typed columns: all-numeric columns
+        # become float64 arrays, mixed label columns stay object
+        data = {}
+        for i in range(len(columns)):
+            col = [row[i] for row in rows]
+            if all(isinstance(v, float) for v in col):
+                data[i] = np.fromiter(col, dtype=np.float64, count=len(col))
+            else:
+                data[i] = np.array(col, dtype=object)
+        df = pd.DataFrame(data)
+        df.columns = columns
+        return df
+
+    def load_table_refs(self, output_dir):
+        self.dedup.load(output_dir)
+
+    def save_table_refs(self, output_dir):
+        self.dedup.save(output_dir)
+
+    def load_line_items(self, output_dir):
+        self.line_items = LineItemIndex.load(os.path.join(output_dir, LINE_ITEMS_FILE))
+
+    def save_line_items(self, output_dir):
+        self.line_items.save(os.path.join(output_dir, LINE_ITEMS_FILE))
+
+    def forget_filing(self, stem, output_dir):
+        # before a changed filing is processed again: its old tables leave the registry, the index and the csv dir
+        table_re = re.compile(rf'^{re.escape(stem)}_\d+$')
+        prefix = f"{stem}_"
+        ids = {t for t in self.line_items.tables if t.startswith(prefix) and table_re.match(t)}
+        ids |= {d for d in self.dedup.duplicates if d.startswith(prefix) and table_re.match(d)}
+        if os.path.isdir(output_dir):
+            ids |= {f[:-4] for f in os.listdir(output_dir) if f.startswith(prefix) and f.endswith('.csv') and table_re.match(f[:-4])}
+        for table_id in ids:
+            if table_id in self.line_items.tables:
+                self.line_items.remove_table(table_id)
+        # tables other filings still resolve to move to the id of one of their duplicates,
+        # the csv under the old id is about to be rewritten with this filing's new content
+        heirs = self.dedup.forget(ids)
+        for old, heir in heirs.items():
+            path = Path(output_dir) / f"{old}.csv"
+            if path.exists():
+                os.replace(path, Path(output_dir) / f"{heir}.csv")
+        for table_id in ids - set(heirs):
+            path = Path(output_dir) / f"{table_id}.csv"
+            if path.exists():
+                path.unlink()
+        return len(ids)
+
     def process_file(self, json_path, output_dir):
         # processing json files
         if not os.path.exists(json_path): return 0
@@ -114,13 +234,40 @@ class FinancialCanonicalizer:
         count = 0
         for item in data:
             if item.get('type') == 'table':
-                df = self.parse_markdown_table(item['content'])
-                if df is not None:
-                    df = df.map(self.clean_cell)
-                    
-                    if self.is_high_quality(df):
-                        file_id = item['id']
-                        output_file = Path(output_dir) / f"{file_id}.csv"
-                        df.to_csv(output_file, index=False)
-                        count += 1
+                self.stats["tables"] += 1
+                t0 = time.perf_counter()
+                scanned = self.scan_markdown_table(item['content'])
+                accepted = scanned is not None and self.is_high_quality_rows(*scanned)
+                self.stats["scan_s"] += time.perf_counter() - t0
+
+                if scanned is None or len(scanned[0]) < 2:
+                    self.stats["rejected_shape"] += 1
+                    continue
+                if not accepted:
+                    # rejected tables are never materialized
+                    self.stats["rejected_quality"] += 1
+                    continue
+
+                self.stats["accepted"] += 1
+                count += 1
+                file_id = item['id']
+                # indexed under its own id even when the csv is deduplicated away
+                self.line_items.add_table(file_id, *scanned)
+
+                # restated / repeated tables are stored once and referenced
+                canonical_id = self.dedup.register(file_id, *scanned)
+                if canonical_id is not None:
+                    self.stats["duplicates"] += 1
+                    canonical_file = Path(output_dir) / f"{canonical_id}.csv"
+                    if canonical_file.exists():
+                        self.stats["bytes_saved"] += canonical_file.stat().st_size
+                    continue
+                if file_id in self.dedup.near_duplicates:
+                    self.stats["near_duplicates"] += 1
+
+                t0 = time.perf_counter()
+                df = self.rows_to_frame(*scanned)
+                output_file = Path(output_dir) / f"{file_id}.csv"
+                df.to_csv(output_file, index=False)
+                self.stats["write_s"] += time.perf_counter() - t0
         return count
@@ -0,0 +1,107 @@
+import os
+import re
+import json
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+# metadata every chunk carries, and the keys the indexes can pre-filter on
+FILTER_KEYS = ("source", "company", "period", "form_type", "section")
+
+# "3M_2018_10K", "JOHNSON_JOHNSON_2023Q2_10Q", "PEPSICO_2023_8K_dated-2023-05-30", "AMCOR_2023Q4_EARNINGS"
+_FILING_RE = re.compile(r'^(?P<company>.+?)_(?P<period>\d{4}(?:Q[1-4])?)_(?P<form>[0-9A-Za-z]+)')
+
+# a heading line: "Item 7.", "ITEM 1A:", "## Item 7A — Quantitative ...", "**Item 8. Financial Statements**"
+_ITEM_RE = re.compile(r'^\s*(?:#+\s*)?(?:\*\*)?\s*item\s+(\d{1,2}[a-c]?)\b\s*[\.:\-—–]?\s*(.*?)(?:\*\*)?\s*$', re.I | re.M)
+
+TEN_K_ITEMS = {
+    "1": "Business", "1a": "Risk Factors", "1b": "Unresolved Staff Comments", "1c": "Cybersecurity",
+    "2": "Properties", "3": "Legal Proceedings", "4": "Mine Safety Disclosures",
+    "5": "Market for Registrant's Common Equity", "6": "Selected Financial Data",
+    "7": "Management's Discussion and Analysis", "7a": "Quantitative and Qualitative Disclosures About Market Risk",
+    "8": "Financial Statements and Supplementary Data", "9": "Changes in and Disagreements with Accountants",
+    "9a": "Controls and Procedures", "9b": "Other Information", "9c": "Disclosure Regarding Foreign Jurisdictions",
+    "10": "Directors, Executive Officers and Corporate Governance", "11": "Executive Compensation",
+    "12": "Security Ownership", "13": "Certain Relationships and Related Transactions",
+    "14": "Principal Accountant Fees and Services", "15": "Exhibits and Financial Statement Schedules",
+    "16": "Form 10-K Summary",
+}
+
+
+def parse_filing_name(source):
+    """company / period / form type from a decomposed file name, "UNKNOWN" when it doesn't follow the corpus naming"""
+    stem = os.path.splitext(os.path.basename(source))[0]
+    stem = stem[:-len("_decomposed")] if stem.endswith("_decomposed") else stem
+    m = _FILING_RE.match(stem)
+    if not m:
+        return {"company": "UNKNOWN", "period": "UNKNOWN", "form_type": "UNKNOWN"}
+    return {"company": m.group("company").upper(), "period": m.group("period").upper(), "form_type": m.group("form").upper()}
+
+
+def split_sections(text):
+    """[(item or None, heading text, body)] in order; the first body is whatever precedes the first heading"""
+    parts, pos, current = [], 0, (None, "")
+    for m in _ITEM_RE.finditer(text):
+        # long lines starting with "Item 7 of this report ..." are prose, not headings
+        if len(m.group(0).strip()) > 150:
+            continue
+        parts.append((*current, text[pos:m.start()]))
+        current, pos = (m.group(1).lower(), m.group(2).strip(" .:*#")), m.end()
+    parts.append((*current, text[pos:]))
+    return parts
+
+
+class SectionChunker:
+    """
+    Streams the text items of a decomposed filing into chunks without
+    joining the filing into one string. Chunks never cross a 10-K item
+    heading, and each carries source, company, period, form_type, section
+    ("item_7", "preamble") and section_title metadata for filtered search.
+    """
+    def __init__(self, chunk_size=1000, chunk_overlap=100, buffer_chunks=8):
+        self.chunk_size = chunk_size
+        self.splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        # text held per section before splitting, keeps memory flat on very long sections
+        self.buffer_limit = chunk_size * buffer_chunks
+
+    def _section(self, item, heading, form_type):
+        if item is None:
+            return "preamble", "Cover page and table of contents"
+        title = TEN_K_ITEMS.get(item) if form_type == "10K" else None
+        return f"item_{item}", title or heading or f"Item {item.upper()}"
+
+    def iter_file(self, file_path):
+        source = os.path.basename(file_path)
+        with open(file_path, 'r', encoding='utf-8') as f:
+            items = json.load(f)
+        yield from self.iter_items(items, source)
+
+    def iter_items(self, items, source):
+        base = dict(parse_filing_name(source), source=source)
+        section, title = self._section(None, "", base["form_type"])
+        buffer, n = "", 0
+
+        def emit(text, final):
+            nonlocal n
+            pieces = self.splitter.split_text(text) if text.strip() else []
+            # the tail of a long section stays buffered so the next item continues it
+            keep = "" if final or not pieces else pieces.pop()
+            for piece in pieces:
+                meta = dict(base, section=section, section_title=title, chunk_id=f"{source}::{n}")
+                n += 1
+                yield Document(page_content=piece, metadata=meta)
+            return keep
+
+        for item in items:
+            if item.get('type') != 'text':
+                continue
+            for k, (heading_item, heading, body) in enumerate(split_sections(item.get('content', ''))):
+                if k > 0:
+                    # new heading: flush the section so no chunk spans two items
+                    yield from emit(buffer, final=True)
+                    buffer = ""
+                    section, title = self._section(heading_item, heading, base["form_type"])
+                if body.strip():
+                    buffer += body.strip() + "\n\n"
+                if len(buffer) >= self.buffer_limit:
+                    buffer = yield from emit(buffer, final=False)
+        yield from emit(buffer, final=True)
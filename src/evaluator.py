@@ -2,11 +2,73 @@ import os
 import pandas as pd
 import numpy as np
 import re
+from collections import OrderedDict
 from datetime import datetime
+from table_dedup import TableDeduplicator
+from line_item_index import LineItemIndex, LINE_ITEMS_FILE
+from line_item_rules import LineItemClassifier, RULES_PATH
 
 class FinancialEvaluator:
-    def __init__(self, canonical_dir):
+    def __init__(self, canonical_dir, table_cache_size=512, rules_path=RULES_PATH):
         self.canonical_dir = canonical_dir
+        # row text -> metric, one compiled pass per row
+        self.classifier = LineItemClassifier.load(rules_path)
+        # deduplicated tables: logical file name -> stored csv, parsed once
+        self.table_refs = TableDeduplicator().load(canonical_dir) if os.path.isdir(canonical_dir) else TableDeduplicator()
+        self._table_cache = OrderedDict()
+        self._table_cache_size = table_cache_size
+        # row label -> cells, built by the canonicalizer; companies missing from it are indexed on first lookup
+        self.line_items = LineItemIndex.load(os.path.join(canonical_dir, LINE_ITEMS_FILE))
+        self._fallback_indexed = set()
+
+    def _company_tables(self, company_id):
+        # (logical file name, stored csv path) including tables kept once via the ref map
+        files = [f for f in os.listdir(self.canonical_dir) if f.startswith(company_id) and f.endswith('.csv')]
+        files += [f"{dup}.csv" for dup in self.table_refs.duplicates if dup.startswith(company_id)]
+        return [(f, os.path.join(self.canonical_dir, f"{self.table_refs.resolve(f[:-4])}.csv")) for f in files]
+
+    def _read_table(self, path):
+        df = self._table_cache.get(path)
+        if df is None:
+            df = pd.read_csv(path)
+            self._table_cache[path] = df
+            if len(self._table_cache) > self._table_cache_size:
+                self._table_cache.popitem(last=False)
+        else:
+            self._table_cache.move_to_end(path)
+        return df
+
+    def _index_company(self, company_id):
+        # older canonical dirs have no index file, build this company's part from its csv files
+        for file_name, path in self._company_tables(company_id):
+            df = self._read_table(path)
+            rows = [[0.0 if pd.isna(v) else float(v) if isinstance(v, (int, float, np.number)) else str(v) for v in row]
+                    for row in df.itertuples(index=False)]
+            self.line_items.add_table(file_name[:-4], [str(c) for c in df.columns], rows, company=company_id)
+        self._fallback_indexed.add(company_id)
+
+    def _companies(self, company_id):
+        # "3M_2018" covers the index's "3M_2018_10K"
+        companies = sorted(c for c in self.line_items.companies() if c.startswith(company_id))
+        if not companies and company_id not in self._fallback_indexed:
+            self._index_company(company_id)
+            companies = sorted(c for c in self.line_items.companies() if c.startswith(company_id))
+        return companies
+
+    def get_line_item(self, company_id, item, period=None):
+        """
+        direct lookup of any line item ("capex", "D&A", "net cash provided by operating activities").
+        period defaults to the filing year in company_id; returns the first matching cell or None
+        """
+        companies = self._companies(company_id)
+        if period is None:
+            m = re.search(r'_(\d{4})', company_id)
+            period = m.group(1) if m else None
+        hits = [h for c in companies for h in self.line_items.lookup(item, company=c, period=period)]
+        if not hits:
+            return None
+        hit = hits[0]
+        return {"value": hit["value"], "label": hit["label"], "period": hit["period"], "source": f"{hit['table']}.csv"}
 
     def _clean_value(self, val):
         if pd.isna(val) or val == "" or str(val).strip() in ["—", "-", "None", "0.0"]:
@@ -35,47 +97,41 @@ class FinancialEvaluator:
                 "assets": {"value": 0.0, "source": None},
                 "liabilities": {"value": 0.0, "source": None}
             },
+            "extended": {},
             "metadata": {"unit": "unknown", "currency": "unknown", "files": []}
         }
         
         target_year = re.search(r'_(\d{4})', company_id).group(1) if re.search(r'_(\d{4})', company_id) else None
         
         try:
-            files = [f for f in os.listdir(self.canonical_dir) if f.startswith(company_id) and f.endswith('.csv')]
-            for file_name in files:
-                df = pd.read_csv(os.path.join(self.canonical_dir, file_name))
-                if df.empty: continue
-                
-                if store["metadata"]["unit"] == "unknown":
-                    u, c = self._detect_context(df)
-                    store["metadata"]["unit"], store["metadata"]["currency"] = u, c
-                
-                store["metadata"]["files"].append(file_name)
-                
-                target_col = None
-                for col_idx in range(df.shape[1]):
-                    header = str(df.columns[col_idx]) + " " + " ".join(df.iloc[:3, col_idx].astype(str))
-                    if target_year and target_year in header:
-                        target_col = col_idx; break
-                
-                if target_col is None: continue
-
-                for i in range(len(df)):
-                    row_txt = " ".join(df.iloc[i, :target_col].astype(str)).lower()
-                    val = self._clean_value(df.iloc[i, target_col])
-                    if val == 0.0: continue
-
-                    # Mapping logic dengan source tracking
-                    target_key = None
-                    if "net sales" in row_txt or "total revenue" in row_txt:
-                        if not any(x in row_txt for x in ["cost", "growth"]): target_key = "revenue"
-                    elif "net income" in row_txt or "net earnings" in row_txt:
-                        if not "per share" in row_txt: target_key = "net_income"
-                    elif "total assets" in row_txt: target_key = "assets"
-                    elif "total liabilities" in row_txt and "equity" not in row_txt: target_key = "liabilities"
-
-                    if target_key:
-                        store["observed"][target_key] = {"value": val, "source": file_name, "ts": datetime.now().isoformat()}
+            # files and unit/currency as before: every csv of the company, context from the first non-empty one
+            tables = self._company_tables(company_id)
+            store["metadata"]["files"] = [f for f, _ in tables]
+            for _, path in tables:
+                df = self._read_table(path)
+                if not df.empty:
+                    store["metadata"]["unit"], store["metadata"]["currency"] = self._detect_context(df)
+                    break
+
+            # cells come from the line-item index, no csv reads: per table the first column
+            # reporting the target year, tables in the same order as the csv listing so later tables win as before
+            cells = [c for company in self._companies(company_id) for c in self.line_items.cells(company)]
+            target_cols = {}
+            for _, period, table, row, col, val, label in cells:
+                if target_year and period == target_year:
+                    target_cols[table] = min(col, target_cols.get(table, col))
+            order = {f[:-4]: i for i, (f, _) in enumerate(tables)}
+            picked = sorted((c for c in cells if target_cols.get(c[2]) == c[4]), key=lambda c: (order.get(c[2], -1), c[3]))
+
+            for _, period, table, row, col, val, label in picked:
+                file_name = f"{table}.csv"
+
+                # Mapping logic dengan source tracking (rules in data/line_item_rules.json)
+                target_key = self.classifier.classify(label.lower())
+
+                if target_key:
+                    section = "observed" if target_key in store["observed"] else "extended"
+                    store[section][target_key] = {"value": val, "source": file_name, "ts": datetime.now().isoformat()}
 
             return store
         except Exception as e:
@@ -127,6 +183,7 @@ class FinancialEvaluator:
             "period": company_id.split('_')[1] if '_' in company_id else "UNKNOWN",
             "knowledge_base": {
                 "observed": obs,
+                "extended": raw["extended"],
                 "inferred": inferred,
                 "accounting_proof": {
                     "equity_deduced": equity_calc if not is_collision else "UNRELIABLE",
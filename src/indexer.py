@@ -1,64 +1,363 @@
 import os
 import json
 import glob
-from langchain_core.documents import Document
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import Chroma
+import time
+import shutil
+import hashlib
+import argparse
+from chunker import SectionChunker, FILTER_KEYS
+from lexical_index import BM25Index, reciprocal_rank_fusion
+
+SUCCESS_MARKER = "_SUCCESS"
+STALE_MARKER = "_STALE"
+
+
+def shard_of(file_path, n_shards):
+    # stable across runs and machines, independent of listing order
+    return int(hashlib.sha1(os.path.basename(file_path).encode("utf-8")).hexdigest(), 16) % n_shards
+
+
+def _fingerprint(files):
+    h = hashlib.sha1()
+    for f in sorted(files):
+        st = os.stat(f)
+        h.update(f"{os.path.basename(f)}:{st.st_size}:{int(st.st_mtime)}".encode("utf-8"))
+    return h.hexdigest()
+
+
+def build_shard(shard_id, n_shards, files, shard_dir, model_name, threads=None):
+    """
+    embeds one shard into a standalone artifact: embeddings.npy + meta.jsonl + _SUCCESS.
+    runs in a worker process (or on another machine), a shard with a matching
+    _SUCCESS is skipped so failed builds resume where they stopped
+    """
+    out = os.path.join(shard_dir, f"shard_{shard_id:03d}")
+    fingerprint = _fingerprint(files)
+    marker = os.path.join(out, SUCCESS_MARKER)
+    if os.path.exists(marker):
+        with open(marker, 'r', encoding='utf-8') as f:
+            done = json.load(f)
+        if done.get("fingerprint") == fingerprint and done.get("of") == n_shards:
+            return dict(done, skipped=True)
+
+    import numpy as np
+    if threads:
+        # keep worker processes from oversubscribing the cores
+        try:
+            import torch
+            torch.set_num_threads(threads)
+        except ImportError:
+            pass
+
+    t0 = time.perf_counter()
+    indexer = FinancialIndexer()
+    indexer.model_name = model_name
+    chunks = list(indexer.iter_chunks(files))
+    vectors = indexer.embeddings.embed_documents([c.page_content for c in chunks]) if chunks else []
+
+    tmp = out + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    np.save(os.path.join(tmp, "embeddings.npy"), np.asarray(vectors, dtype=np.float32))
+    with open(os.path.join(tmp, "meta.jsonl"), 'w', encoding='utf-8') as f:
+        for c in chunks:
+            f.write(json.dumps({"id": c.metadata["chunk_id"], "metadata": c.metadata, "content": c.page_content}) + "\n")
+    done = {"shard": shard_id, "of": n_shards, "files": len(files), "chunks": len(chunks), "seconds": round(time.perf_counter() - t0, 2),
+            "fingerprint": fingerprint}
+    with open(os.path.join(tmp, SUCCESS_MARKER), 'w', encoding='utf-8') as f:
+        json.dump(done, f)
+    shutil.rmtree(out, ignore_errors=True)
+    os.replace(tmp, out)
+    return dict(done, skipped=False)
+
 
 class FinancialIndexer:
     def __init__(self):
         self.input_dir = "data/processed/decomposed"
         self.db_dir = "data/database/chroma_db"
-        self.embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+        self.lexical_path = "data/database/lexical_index.pkl"
+        self.shard_dir = "data/database/shards"
+        self.quantized_dir = "data/database/quantized"
+        # dense candidates from "chroma", or the compressed "int8" / "binary" index
+        self.dense_backend = "chroma"
+        self.model_name = "all-MiniLM-L6-v2"
+        # item-by-item, section-bounded chunks tagged with company / period / form_type / section
+        self.chunker = SectionChunker(chunk_size=1000, chunk_overlap=100)
+        self._embeddings = None
+        self._vector_db = None
+        self._lexical = None
+        self._quantized = None
+
+    @property
+    def embeddings(self):
+        # the sentence-transformers model is loaded only when we actually embed
+        if self._embeddings is None:
+            from langchain_community.embeddings import HuggingFaceEmbeddings
+            self._embeddings = HuggingFaceEmbeddings(model_name=self.model_name)
+        return self._embeddings
+
+    @property
+    def vector_db(self):
+        if self._vector_db is None:
+            from langchain_community.vectorstores import Chroma
+            self._vector_db = Chroma(persist_directory=self.db_dir, embedding_function=self.embeddings)
+        return self._vector_db
+
+    @property
+    def lexical(self):
+        # BM25 postings over the same chunks as the vector store
+        if self._lexical is None:
+            self._lexical = BM25Index.load(self.lexical_path)
+        return self._lexical
+
+    @property
+    def quantized(self):
+        # rebuilt from the collection when it was never built or a write since made it stale
+        if self._quantized is None:
+            from quantized_index import QuantizedIndex
+            if not QuantizedIndex.exists(self.quantized_dir) or os.path.exists(os.path.join(self.quantized_dir, STALE_MARKER)):
+                self.build_quantized()
+            else:
+                self._quantized = QuantizedIndex.load(self.quantized_dir)
+        return self._quantized
+
+    def _invalidate_quantized(self):
+        # every write to the collection goes through here, the codes no longer cover its ids
+        self._quantized = None
+        if os.path.isdir(self.quantized_dir):
+            with open(os.path.join(self.quantized_dir, STALE_MARKER), 'w') as f:
+                f.write(time.strftime("%Y-%m-%dT%H:%M:%S"))
+
+    def build_quantized(self):
+        # int8 + sign codes of every stored chunk vector, float32 kept on disk for re-ranking
+        from quantized_index import QuantizedIndex
+        data = self.vector_db._collection.get(include=["embeddings", "metadatas"])
+        self._quantized = QuantizedIndex.build(data["ids"], data["embeddings"], data["metadatas"])
+        self._quantized.save(self.quantized_dir)
+        stale = os.path.join(self.quantized_dir, STALE_MARKER)
+        if os.path.exists(stale):
+            os.remove(stale)
+        sizes = self._quantized.memory_bytes()
+        print(f"quantized {len(self._quantized)} vectors: int8 {sizes['int8'] / 1e6:.1f} MB, "
+              f"binary {sizes['binary'] / 1e6:.1f} MB (float32 {sizes['float32'] / 1e6:.1f} MB on disk), "
+              f"each including {sizes['metadata'] / 1e6:.1f} MB of ids and filter fields")
+
+    def iter_chunks(self, files):
+        # one filing at a time, chunk ids stay <source>::<n> for both indexes
+        for file_path in files:
+            try:
+                yield from self.chunker.iter_file(file_path)
+            except Exception as e:
+                print(f"failed to read {file_path}: {e}")
 
-    def create_index(self):
+    def create_index(self, batch_size=1000):
         # searching all json file in decomposed folder
         files = glob.glob(os.path.join(self.input_dir, "*.json"))
-        
+
         if not files:
             print(f"didn't found json file in {self.input_dir}")
             return
 
-        print(f"reading {len(files)} file decomposed...")
-        
-        all_docs = []
-        for file_path in files:
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    
-                narrative_text = ""
-                for item in data:
-                    if item.get('type') == 'text':
-                        narrative_text += item.get('content', '') + "\n\n"
-                
-                if narrative_text.strip():
-                    # adding list into langchain docs and metadata
-                    doc = Document(
-                        page_content=narrative_text,
-                        metadata={"source": os.path.basename(file_path)}
-                    )
-                    all_docs.append(doc)
-            except Exception as e:
-                print(f"failed to read {file_path}: {e}")
+        print(f"streaming {len(files)} decomposed files into the vector database and lexical index")
+        # a full build starts from an empty collection: reused chunk ids would otherwise keep their old
+        # vectors and chunks that no longer exist would stay searchable next to the fresh BM25 index
+        self.vector_db.delete_collection()
+        self._vector_db = None
+        self._invalidate_quantized()
+        self._lexical = BM25Index()
+        batch, total = [], 0
+        for chunk in self.iter_chunks(files):
+            batch.append(chunk)
+            self._lexical.add(chunk.metadata["chunk_id"], chunk.page_content, chunk.metadata)
+            if len(batch) >= batch_size:
+                self.vector_db.add_documents(batch, ids=[c.metadata["chunk_id"] for c in batch])
+                total += len(batch)
+                batch = []
+        if batch:
+            self.vector_db.add_documents(batch, ids=[c.metadata["chunk_id"] for c in batch])
+            total += len(batch)
 
-        if not all_docs:
+        if not total:
             print("there's no succees  naration extration")
             return
+        self._lexical.save(self.lexical_path)
+        print(f"finished, {total} chunks")
+
+    def partition(self, files, n_shards):
+        shards = {i: [] for i in range(n_shards)}
+        for f in files:
+            shards[shard_of(f, n_shards)].append(f)
+        return shards
 
-        print(f"chunking {len(all_docs)} docs")
-        text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-        chunks = text_splitter.split_documents(all_docs)
+    def create_index_sharded(self, n_shards=4, workers=None, only_shards=None, merge=True):
+        """
+        sharded rebuild: each shard is embedded in its own process into shard_dir,
+        then all shards are merged into Chroma + BM25. only_shards builds a subset
+        (e.g. one shard per machine with a shared shard_dir) and skips the merge
+        """
+        files = glob.glob(os.path.join(self.input_dir, "*.json"))
+        if not files:
+            print(f"didn't found json file in {self.input_dir}")
+            return
+        shards = self.partition(files, n_shards)
+        todo = [i for i in shards if only_shards is None or i in only_shards]
+        if not todo:
+            print(f"no non-empty shard among {sorted(only_shards)} of {n_shards}, nothing to build")
+            return
+        workers = workers or min(len(todo), os.cpu_count() or 1)
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        print(f"building {len(todo)}/{n_shards} shards of {len(files)} files with {workers} workers")
 
-        print(f"save {len(chunks)} to vector database")
-        vector_db = Chroma.from_documents(
-            documents=chunks,
-            embedding=self.embeddings,
-            persist_directory=self.db_dir
-        )
-        print(f"finished")
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+        t0 = time.perf_counter()
+        results, failed = [], []
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(build_shard, i, n_shards, shards[i], self.shard_dir, self.model_name, threads): i for i in todo}
+            for fut in as_completed(futures):
+                i = futures[fut]
+                try:
+                    r = fut.result()
+                    results.append(r)
+                    print(f" shard {i:03d}: {r['chunks']} chunks in {r['seconds']}s" + (" (already built)" if r["skipped"] else ""))
+                except Exception as e:
+                    failed.append(i)
+                    print(f" shard {i:03d}: FAILED {e}")
+        wall = time.perf_counter() - t0
+
+        built = [r for r in results if not r["skipped"]]
+        if built:
+            chunks = sum(r["chunks"] for r in built)
+            busy = sum(r["seconds"] for r in built)
+            print(f"embedded {chunks} chunks in {wall:.1f}s wall ({chunks / wall:.1f} chunks/s), "
+                  f"single-process estimate {chunks / busy if busy else 0:.1f} chunks/s, scaling x{busy / wall:.2f}")
+        if failed:
+            print(f"{len(failed)} shard(s) failed: {sorted(failed)}, rerun to resume them")
+            return
+        if merge and only_shards is None:
+            self.merge_shards(n_shards)
+
+    def merge_shards(self, n_shards=None, batch_size=4000):
+        import numpy as np
+        markers = {}
+        for d in sorted(glob.glob(os.path.join(self.shard_dir, "shard_*"))):
+            marker = os.path.join(d, SUCCESS_MARKER)
+            if not d.endswith(".tmp") and os.path.exists(marker):
+                with open(marker, 'r', encoding='utf-8') as f:
+                    markers[d] = json.load(f)
+        # only shards of one partitioning, and all of them
+        n_shards = n_shards or max((m["of"] for m in markers.values()), default=0)
+        dirs = [d for d, m in markers.items() if m["of"] == n_shards]
+        missing = sorted(set(range(n_shards)) - {markers[d]["shard"] for d in dirs})
+        if missing or not dirs:
+            print(f"cannot merge, shards not built yet: {missing or 'all'}")
+            return
+
+        t0 = time.perf_counter()
+        # the shards are the whole corpus, like a full build: chunks of files that were removed or
+        # re-chunked into fewer pieces since the last merge must not survive the upserts
+        self.vector_db.delete_collection()
+        self._vector_db = None
+        self._invalidate_quantized()
+        collection = self.vector_db._collection
+        self._lexical = BM25Index()
+        total = 0
+        for d in dirs:
+            vectors = np.load(os.path.join(d, "embeddings.npy"))
+            with open(os.path.join(d, "meta.jsonl"), 'r', encoding='utf-8') as f:
+                rows = [json.loads(line) for line in f]
+            for start in range(0, len(rows), batch_size):
+                batch = rows[start:start + batch_size]
+                collection.upsert(
+                    ids=[r["id"] for r in batch],
+                    embeddings=vectors[start:start + batch_size].tolist(),
+                    metadatas=[r["metadata"] for r in batch],
+                    documents=[r["content"] for r in batch]
+                )
+            for r in rows:
+                self._lexical.add(r["id"], r["content"], r["metadata"])
+            total += len(rows)
+        self._lexical.save(self.lexical_path)
+        print(f"merged {len(dirs)} shards, {total} chunks in {time.perf_counter() - t0:.1f}s")
+
+    def update_index(self, files, save=True):
+        # incremental: replace only the chunks of the given decomposed files
+        chunks = list(self.iter_chunks(files))
+        for file_path in files:
+            source = os.path.basename(file_path)
+            self.lexical.remove_source(source)
+            self.vector_db._collection.delete(where={"source": source})
+
+        self._invalidate_quantized()
+        if chunks:
+            self.vector_db.add_documents(chunks, ids=[c.metadata["chunk_id"] for c in chunks])
+            for c in chunks:
+                self.lexical.add(c.metadata["chunk_id"], c.page_content, c.metadata)
+        # callers updating many files in a row save the BM25 pickle once at the end
+        if save:
+            self.lexical.save(self.lexical_path)
+        print(f"updated {len(files)} file(s), {len(chunks)} chunks")
+        return len(chunks)
+
+    @staticmethod
+    def _chroma_filter(where):
+        # chroma takes a single field as-is, several need an explicit $and
+        if not where or len(where) == 1:
+            return where or None
+        return {"$and": [{key: val} for key, val in where.items()]}
+
+    def search(self, query, k=5, candidates=40, where=None, mode="hybrid", with_content=True, **filters):
+        """
+        mode: "dense", "lexical" or "hybrid" (reciprocal-rank fusion of both).
+        filters: company / period / form_type / section / source, merged into where,
+        e.g. search("goodwill impairment", company="3M", period="2018", section="item_7").
+        returns [{"chunk_id", "source", "section", "content", "score"}], best first
+        """
+        unknown = set(filters) - set(FILTER_KEYS)
+        if unknown:
+            raise ValueError(f"unknown filter(s) {sorted(unknown)}, expected {FILTER_KEYS}")
+        where = dict(where or {}, **{key: val for key, val in filters.items() if val is not None}) or None
+        dense_ids, lexical_ids = [], []
+        if mode in ("dense", "hybrid"):
+            if self.dense_backend == "chroma":
+                docs = self.vector_db.similarity_search(query, k=candidates, filter=self._chroma_filter(where))
+                dense_ids = [d.metadata["chunk_id"] for d in docs]
+            else:
+                hits = self.quantized.search(self.embeddings.embed_query(query), k=candidates, mode=self.dense_backend, where=where)
+                dense_ids = [doc_id for doc_id, _ in hits]
+        if mode in ("lexical", "hybrid"):
+            lexical_ids = [doc_id for doc_id, _ in self.lexical.search(query, k=candidates, where=where)]
+
+        fused = reciprocal_rank_fusion([r for r in (dense_ids, lexical_ids) if r])[:k]
+        if not fused or not with_content:
+            return [{"chunk_id": doc_id, "score": round(score, 5)} for doc_id, score in fused]
+        # chunk text is kept in the BM25 index, chroma is only asked for ids it lacks (older pickles)
+        lexical = self.lexical
+        by_id = {doc_id: (lexical.texts[doc_id], lexical.metadata[doc_id]) for doc_id, _ in fused if doc_id in lexical.texts}
+        missing = [doc_id for doc_id, _ in fused if doc_id not in by_id]
+        if missing and mode != "lexical":
+            found = self.vector_db.get(ids=missing)
+            by_id.update({i: (doc, meta) for i, doc, meta in zip(found["ids"], found["documents"], found["metadatas"])})
+        return [
+            {"chunk_id": doc_id, "source": by_id[doc_id][1].get("source"), "section": by_id[doc_id][1].get("section"),
+             "content": by_id[doc_id][0], "score": round(score, 5)}
+            for doc_id, score in fused if doc_id in by_id
+        ]
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="build the filing retrieval index")
+    parser.add_argument("--shards", type=int, default=0, help="sharded multi-process build with this many shards")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--only-shard", type=int, nargs="+", default=None, help="build just these shards (no merge)")
+    parser.add_argument("--merge", action="store_true", help="only merge already built shards")
+    parser.add_argument("--quantize", action="store_true", help="also build the int8 / binary index")
+    args = parser.parse_args()
+
     indexer = FinancialIndexer()
-    indexer.create_index()
+    if args.merge:
+        indexer.merge_shards(args.shards or None)
+    elif args.shards:
+        indexer.create_index_sharded(args.shards, workers=args.workers, only_shards=args.only_shard)
+    else:
+        indexer.create_index()
+    if args.quantize:
+        indexer.build_quantized()
@@ -0,0 +1,348 @@
+import os
+import re
+import json
+import time
+import queue
+import hashlib
+import threading
+from pathlib import Path
+from datetime import datetime
+from decomposition import decompose_markdown
+from canonicalizer import FinancialCanonicalizer
+from evaluator import FinancialEvaluator
+
+MANIFEST_FILE = "ingestion_manifest.json"
+
+# bump a stage's version when its code changes output, every node of that stage is recomputed
+STAGE_VERSIONS = {"decompose": 1, "canonicalize": 2, "evaluate": 1, "index": 1}
+
+# "3M_2018_10K" -> "3M_2018", "JOHNSON_JOHNSON_2023Q2_10Q" -> "JOHNSON_JOHNSON_2023Q2"
+_COMPANY_RE = re.compile(r'^(.+?_\d{4}(?:Q[1-4])?)(?:_|$)')
+
+_DONE = object()
+
+
+def company_of(stem):
+    m = _COMPANY_RE.match(stem)
+    return m.group(1) if m else "_".join(stem.split("_")[:2])
+
+
+def digest(*parts):
+    h = hashlib.sha1()
+    for p in parts:
+        h.update(p if isinstance(p, bytes) else str(p).encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class Manifest:
+    """
+    node -> {"digest", "outputs", "seconds", "ts"}. A node's digest hashes its
+    stage version and its inputs (the markdown bytes, or upstream digests), so a
+    node is recomputed only when something it depends on changed.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.nodes = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.nodes = json.load(f).get("nodes", {})
+
+    def fresh(self, node, node_digest):
+        entry = self.nodes.get(node)
+        return entry is not None and entry["digest"] == node_digest and all(os.path.exists(p) for p in entry["outputs"])
+
+    def record(self, node, node_digest, outputs, seconds):
+        with self._lock:
+            self.nodes[node] = {"digest": node_digest, "outputs": outputs, "seconds": round(seconds, 4),
+                                "ts": datetime.now().isoformat(timespec="seconds")}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with self._lock, open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({"nodes": self.nodes}, f, indent=2)
+        os.replace(tmp, self.path)
+
+
+class _Stage:
+    # a pool of worker threads between a bounded inbox and the inboxes of the stages downstream
+    def __init__(self, name, fn, workers=1, queue_size=8, sees_failures=False):
+        self.name = name
+        self.fn = fn
+        self.workers = workers
+        # failed items are still shown to fn, e.g. so evaluate can count them off a company
+        self.sees_failures = sees_failures
+        self.inbox = queue.Queue(maxsize=queue_size)
+        self.outboxes = []
+        self._lock = threading.Lock()
+        self._alive = workers
+        self.stats = {"computed": 0, "skipped": 0, "failed": 0, "upstream_failed": 0, "busy_s": 0.0,
+                      "first_s": None, "last_s": None}
+
+    def _count(self, field, busy=0.0, start=None, end=None):
+        with self._lock:
+            self.stats[field] += 1
+            self.stats["busy_s"] += busy
+            if start is not None:
+                self.stats["first_s"] = start if self.stats["first_s"] is None else min(self.stats["first_s"], start)
+                self.stats["last_s"] = end if self.stats["last_s"] is None else max(self.stats["last_s"], end)
+
+    def _worker(self):
+        while True:
+            item = self.inbox.get()
+            if item is _DONE:
+                # let sibling workers see it too
+                self.inbox.put(_DONE)
+                break
+            if item.get("error"):
+                self._count("upstream_failed")
+                out = item
+                if self.sees_failures:
+                    t0 = time.perf_counter()
+                    try:
+                        # the failed item itself passes on unchanged, but it may complete other work
+                        if self.fn(item)[1]:
+                            end = time.perf_counter()
+                            self._count("computed", end - t0, t0, end)
+                    except Exception as e:
+                        print(f"[{self.name}] {item.get('stem')}: FAILED {e}")
+                        self._count("failed")
+            else:
+                t0 = time.perf_counter()
+                try:
+                    out, computed = self.fn(item)
+                    end = time.perf_counter()
+                    self._count("computed" if computed else "skipped", end - t0 if computed else 0.0,
+                                t0 if computed else None, end if computed else None)
+                except Exception as e:
+                    print(f"[{self.name}] {item.get('stem')}: FAILED {e}")
+                    self._count("failed")
+                    out = dict(item, error=f"{self.name}: {e}")
+            for box in self.outboxes:
+                box.put(out)
+        with self._lock:
+            self._alive -= 1
+            last = self._alive == 0
+        if last:
+            for box in self.outboxes:
+                box.put(_DONE)
+
+    def start(self):
+        self.threads = [threading.Thread(target=self._worker, name=f"ingest-{self.name}-{i}", daemon=True)
+                        for i in range(self.workers)]
+        for t in self.threads:
+            t.start()
+
+
+class IngestionPipeline:
+    """
+    Streams each markdown filing through decompose -> canonicalize -> evaluate,
+    with decompose also feeding the retrieval index, as a DAG of thread stages
+    joined by bounded queues: a filing is canonicalized while the next one is
+    still being decomposed. Every node is content-addressed in a manifest, so
+    adding or editing one filing recomputes only that filing's nodes and the
+    evaluations that read its tables.
+    """
+    def __init__(self, markdown_dir="data/processed/markdown", decomposed_dir="data/processed/decomposed",
+                 canonical_dir="data/processed/canonical", evaluations_dir="data/results/evaluations",
+                 manifest_path=None, index=True, queue_size=8, decompose_workers=2, sample_s=0.05):
+        self.markdown_dir = markdown_dir
+        self.decomposed_dir = decomposed_dir
+        self.canonical_dir = canonical_dir
+        self.evaluations_dir = evaluations_dir
+        self.manifest = Manifest(manifest_path or os.path.join(os.path.dirname(canonical_dir.rstrip("/\\")) or ".", MANIFEST_FILE))
+        self.index = index
+        self.queue_size = queue_size
+        self.decompose_workers = decompose_workers
+        self.sample_s = sample_s
+        self.force = False
+
+        self.cleaner = FinancialCanonicalizer()
+        self.evaluator = None
+        self.indexer = None
+        # the canonicalizer's registry and the evaluator's reads of the csv dir don't overlap
+        self._canonical_lock = threading.Lock()
+        self._pending = {}      # company -> filings still to pass canonicalize
+        self._company_digests = {}
+        self._failed_filings = {}   # company -> filings that failed before evaluate
+        self._changed_sources = []
+
+    # stages: fn(item) -> (item for downstream, computed?)
+    def _decompose(self, item):
+        raw = Path(item["path"]).read_bytes()
+        node_digest = digest("decompose", STAGE_VERSIONS["decompose"], raw)
+        out_path = os.path.join(self.decomposed_dir, f"{item['stem']}_decomposed.json")
+        item = dict(item, decomposed=out_path, digest=node_digest)
+        node = f"decompose/{item['stem']}"
+        if not self.force and self.manifest.fresh(node, node_digest):
+            return item, False
+        t0 = time.perf_counter()
+        result = decompose_markdown(item["path"])
+        tmp = out_path + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=4)
+        os.replace(tmp, out_path)
+        self.manifest.record(node, node_digest, [out_path], time.perf_counter() - t0)
+        return item, True
+
+    def _canonicalize(self, item):
+        node_digest = digest("canonicalize", STAGE_VERSIONS["canonicalize"], item["digest"])
+        node = f"canonicalize/{item['stem']}"
+        item = dict(item, digest=node_digest)
+        if not self.force and self.manifest.fresh(node, node_digest):
+            return item, False
+        t0 = time.perf_counter()
+        with self._canonical_lock:
+            self.cleaner.forget_filing(item["stem"], self.canonical_dir)
+            tables = self.cleaner.process_file(item["decomposed"], self.canonical_dir)
+        self.manifest.record(node, node_digest, [item["decomposed"]], time.perf_counter() - t0)
+        return dict(item, tables=tables), True
+
+    def _resolved_tables(self, company):
+        # "table=stored table:content hash" for every table the company reads, shared csv files included
+        dedup = self.cleaner.dedup
+        owner_hash = {c: h for h, c in dedup.hashes.items()}
+        resolved = []
+        for file_name, _ in self.evaluator._company_tables(company):
+            stored = dedup.resolve(file_name[:-4])
+            resolved.append(f"{file_name[:-4]}={stored}:{owner_hash.get(stored)}")
+        return sorted(resolved)
+
+    def _evaluate(self, item):
+        # a company is evaluated once all of its filings in this run are through canonicalize,
+        # failed ones are counted off too and the company is evaluated from the filings that made it
+        company = item["company"]
+        if item.get("error"):
+            self._failed_filings.setdefault(company, []).append(item["stem"])
+        else:
+            self._company_digests.setdefault(company, []).append(item["digest"])
+        self._pending[company] -= 1
+        if self._pending[company] or company not in self._company_digests:
+            return item, False
+        node = f"evaluate/{company}"
+        out_path = os.path.join(self.evaluations_dir, f"{company}_eval.json")
+        with self._canonical_lock:
+            # a table shared with another company's filing changes this company's inputs too
+            node_digest = digest("evaluate", STAGE_VERSIONS["evaluate"], *sorted(self._company_digests[company]),
+                                 *self._resolved_tables(company))
+        if not self.force and self.manifest.fresh(node, node_digest):
+            return item, False
+        t0 = time.perf_counter()
+        with self._canonical_lock:
+            report = self.evaluator.analyze_company(company)
+        with open(out_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=4)
+        self.manifest.record(node, node_digest, [out_path], time.perf_counter() - t0)
+        return item, True
+
+    def _index(self, item):
+        node_digest = digest("index", STAGE_VERSIONS["index"], item["digest"])
+        node = f"index/{item['stem']}"
+        if not self.force and self.manifest.fresh(node, node_digest):
+            return item, False
+        t0 = time.perf_counter()
+        self.indexer.update_index([item["decomposed"]], save=False)
+        self._changed_sources.append(item["stem"])
+        self.manifest.record(node, node_digest, [item["decomposed"]], time.perf_counter() - t0)
+        return item, True
+
+    def _sample(self, stages, stop, occupancy):
+        while not stop.wait(self.sample_s):
+            for s in stages:
+                n = s.inbox.qsize()
+                o = occupancy[s.name]
+                o["samples"] += 1
+                o["sum"] += n
+                o["max"] = max(o["max"], n)
+                o["full"] += n >= s.inbox.maxsize
+
+    def run(self, force=False):
+        self.force = force
+        files = sorted(Path(self.markdown_dir).rglob("*.md"))
+        if not files:
+            print(f"no markdown filings in {self.markdown_dir}")
+            return None
+        for d in (self.decomposed_dir, self.canonical_dir, self.evaluations_dir):
+            os.makedirs(d, exist_ok=True)
+
+        self.cleaner.load_table_refs(self.canonical_dir)
+        self.cleaner.load_line_items(self.canonical_dir)
+        self.evaluator = FinancialEvaluator(self.canonical_dir)
+        # the evaluator reads the registry the canonicalizer is filling, not a stale copy from disk
+        self.evaluator.table_refs = self.cleaner.dedup
+        self.evaluator.line_items = self.cleaner.line_items
+
+        items = [{"path": str(p), "stem": p.stem, "company": company_of(p.stem)} for p in files]
+        self._pending, self._company_digests, self._failed_filings = {}, {}, {}
+        for it in items:
+            self._pending[it["company"]] = self._pending.get(it["company"], 0) + 1
+
+        decompose = _Stage("decompose", self._decompose, self.decompose_workers, self.queue_size)
+        canonicalize = _Stage("canonicalize", self._canonicalize, 1, self.queue_size)
+        evaluate = _Stage("evaluate", self._evaluate, 1, self.queue_size, sees_failures=True)
+        stages = [decompose, canonicalize, evaluate]
+        decompose.outboxes.append(canonicalize.inbox)
+        canonicalize.outboxes.append(evaluate.inbox)
+        if self.index:
+            from indexer import FinancialIndexer
+            self.indexer = FinancialIndexer()
+            self.indexer.input_dir = self.decomposed_dir
+            index = _Stage("index", self._index, 1, self.queue_size)
+            decompose.outboxes.append(index.inbox)
+            stages.append(index)
+
+        occupancy = {s.name: {"samples": 0, "sum": 0, "max": 0, "full": 0} for s in stages}
+        stop = threading.Event()
+        sampler = threading.Thread(target=self._sample, args=(stages, stop, occupancy), daemon=True)
+
+        print(f"ingesting {len(items)} filings ({len(self._pending)} companies) through {' / '.join(s.name for s in stages)}")
+        t0 = time.perf_counter()
+        sampler.start()
+        for s in stages:
+            s.start()
+        try:
+            for it in items:
+                # blocks while decompose is behind, which is the backpressure
+                decompose.inbox.put(it)
+            decompose.inbox.put(_DONE)
+            for s in stages:
+                for t in s.threads:
+                    t.join()
+        finally:
+            stop.set()
+            sampler.join()
+            # registry, line-item index, BM25 and manifest are written once, after the stages drain
+            self.cleaner.save_table_refs(self.canonical_dir)
+            self.cleaner.save_line_items(self.canonical_dir)
+            if self.indexer is not None and self._changed_sources:
+                self.indexer.lexical.save(self.indexer.lexical_path)
+            self.manifest.save()
+        wall = time.perf_counter() - t0
+        return self.report(stages, occupancy, wall, len(items))
+
+    def report(self, stages, occupancy, wall, n_filings):
+        out = {"filings": n_filings, "wall_s": round(wall, 3), "stages": {}}
+        for s in stages:
+            st, occ = s.stats, occupancy[s.name]
+            active = (st["last_s"] - st["first_s"]) if st["first_s"] is not None else 0.0
+            out["stages"][s.name] = {
+                "workers": s.workers,
+                "computed": st["computed"], "skipped": st["skipped"],
+                "failed": st["failed"], "upstream_failed": st["upstream_failed"],
+                "busy_s": round(st["busy_s"], 3),
+                "items_per_s": round(st["computed"] / st["busy_s"] * s.workers, 2) if st["busy_s"] else None,
+                # share of the run the stage's workers spent computing
+                "utilization": round(st["busy_s"] / (wall * s.workers), 3) if wall else 0.0,
+                "active_s": round(active, 3),
+                "queue_mean": round(occ["sum"] / occ["samples"], 2) if occ["samples"] else 0.0,
+                "queue_max": occ["max"],
+                "queue_full_pct": round(100 * occ["full"] / occ["samples"], 1) if occ["samples"] else 0.0,
+            }
+        busiest = max(out["stages"].items(), key=lambda kv: kv[1]["utilization"])
+        out["bottleneck"] = busiest[0] if busiest[1]["busy_s"] else None
+        # companies evaluated without some of their filings, and those with none left to evaluate
+        out["incomplete"] = {c: sorted(stems) for c, stems in self._failed_filings.items() if c in self._company_digests}
+        out["unevaluated"] = sorted(c for c in self._failed_filings if c not in self._company_digests)
+        return out
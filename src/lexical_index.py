@@ -0,0 +1,152 @@
+import os
+import re
+import math
+import heapq
+import pickle
+from collections import Counter, defaultdict
+
+# numbers keep their separators so "1,577" and "1577" collapse to one token,
+# words and years split apart so "FY2018" matches "2018"
+_TOKEN_RE = re.compile(r"[a-z]+|\d+(?:[.,]\d+)*")
+STOPWORDS = {"the", "a", "an", "of", "and", "or", "in", "on", "for", "to", "is", "are", "was", "were",
+             "by", "with", "as", "at", "from", "that", "this", "be", "its", "it", "what", "which"}
+
+
+def tokenize(text):
+    tokens = []
+    for tok in _TOKEN_RE.findall(text.lower()):
+        if tok[0].isdigit():
+            tok = tok.replace(",", "")
+        elif tok in STOPWORDS:
+            continue
+        tokens.append(tok)
+    return tokens
+
+
+class BM25Index:
+    """
+    In-memory inverted index with Okapi BM25 scoring.
+    Documents can be added and removed per source file, so a re-ingested
+    filing only touches its own postings.
+    """
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(dict)   # term -> {doc_id: tf}
+        self.doc_len = {}
+        self.doc_terms = {}                 # doc_id -> terms, so removal touches only its postings
+        self.metadata = {}
+        self.texts = {}                     # doc_id -> chunk text, so lexical results need no vector store
+        self.by_field = defaultdict(set)    # (metadata key, value) -> doc ids, for pre-filtering
+        self._total_len = 0
+
+    def __len__(self):
+        return len(self.doc_len)
+
+    def add(self, doc_id, text, metadata=None):
+        if doc_id in self.doc_len:
+            self.remove(doc_id)
+        tokens = tokenize(text)
+        counts = Counter(tokens)
+        for term, tf in counts.items():
+            self.postings[term][doc_id] = tf
+        self.doc_terms[doc_id] = list(counts)
+        self.doc_len[doc_id] = len(tokens)
+        self._total_len += len(tokens)
+        self.metadata[doc_id] = metadata or {}
+        self.texts[doc_id] = text
+        for field in self._fields(self.metadata[doc_id]):
+            self.by_field[field].add(doc_id)
+
+    @staticmethod
+    def _fields(meta):
+        # chunk ids are unique, indexing them would only bloat the map
+        return [(key, val) for key, val in meta.items() if key != "chunk_id" and isinstance(val, (str, int, float, bool))]
+
+    def _select(self, where):
+        # doc ids matching every where clause, smallest set first
+        sets = sorted((self.by_field.get(field, set()) for field in where.items()), key=len)
+        return set.intersection(*sets) if sets else set()
+
+    def remove(self, doc_id):
+        if doc_id not in self.doc_len:
+            return
+        meta = self.metadata.pop(doc_id)
+        self.texts.pop(doc_id, None)
+        for field in self._fields(meta):
+            ids = self.by_field.get(field)
+            if ids is not None:
+                ids.discard(doc_id)
+                if not ids:
+                    del self.by_field[field]
+        self._total_len -= self.doc_len.pop(doc_id)
+        for term in self.doc_terms.pop(doc_id):
+            posting = self.postings[term]
+            posting.pop(doc_id, None)
+            if not posting:
+                del self.postings[term]
+
+    def remove_source(self, source):
+        for doc_id in list(self.by_field.get(("source", source), ())):
+            self.remove(doc_id)
+
+    def search(self, query, k=10, where=None):
+        n = len(self.doc_len)
+        if n == 0:
+            return []
+        avgdl = self._total_len / n
+        # pre-filter: with a where clause only the matching slice is scored (idf stays corpus-wide)
+        allowed = self._select(where) if where else None
+        if allowed is not None and not allowed:
+            return []
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            if allowed is None:
+                hits = posting.items()
+            elif len(allowed) < len(posting):
+                hits = [(d, posting[d]) for d in allowed if d in posting]
+            else:
+                hits = [(d, tf) for d, tf in posting.items() if d in allowed]
+            for doc_id, tf in hits:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_len[doc_id] / avgdl)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return heapq.nlargest(k, scores.items(), key=lambda x: x[1])
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "wb") as f:
+            pickle.dump({"k1": self.k1, "b": self.b, "postings": dict(self.postings), "doc_len": self.doc_len,
+                         "doc_terms": self.doc_terms, "metadata": self.metadata,
+                         "texts": self.texts}, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path):
+        index = cls()
+        if not os.path.exists(path):
+            return index
+        with open(path, "rb") as f:
+            data = pickle.load(f)
+        index.k1, index.b = data["k1"], data["b"]
+        index.postings = defaultdict(dict, data["postings"])
+        index.doc_len = data["doc_len"]
+        index.doc_terms = data["doc_terms"]
+        index.metadata = data["metadata"]
+        index.texts = data.get("texts", {})
+        index._total_len = sum(index.doc_len.values())
+        for doc_id, meta in index.metadata.items():
+            for field in index._fields(meta):
+                index.by_field[field].add(doc_id)
+        return index
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    # rankings: lists of doc ids, best first
+    fused = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            fused[doc_id] += 1.0 / (k + rank + 1)
+    return sorted(fused.items(), key=lambda x: -x[1])
@@ -0,0 +1,186 @@
+import os
+import re
+import json
+from line_item_rules import RULES_PATH
+
+LINE_ITEMS_FILE = "line_item_index.json"
+
+# resolved ticker -> entity prefix of the corpus file names ("MMM" -> "3M_2018_10K"), underscores dropped
+TICKER_ENTITIES = {
+    "MMM": "3M", "ATVI": "ACTIVISIONBLIZZARD", "ADBE": "ADOBE", "AES": "AES", "AMZN": "AMAZON", "AMCR": "AMCOR",
+    "AMD": "AMD", "AXP": "AMERICANEXPRESS", "AWK": "AMERICANWATERWORKS", "BBY": "BESTBUY", "SQ": "BLOCK",
+    "XYZ": "BLOCK", "BA": "BOEING", "KO": "COCACOLA", "GLW": "CORNING", "COST": "COSTCO", "CVS": "CVSHEALTH",
+    "FL": "FOOTLOCKER", "GIS": "GENERALMILLS", "JNJ": "JOHNSONJOHNSON", "JPM": "JPMORGAN", "KHC": "KRAFTHEINZ",
+    "LMT": "LOCKHEEDMARTIN", "MGM": "MGMRESORTS", "MSFT": "MICROSOFT", "NFLX": "NETFLIX", "NKE": "NIKE",
+    "PYPL": "PAYPAL", "PEP": "PEPSICO", "PFE": "PFIZER", "ULTA": "ULTABEAUTY", "VZ": "VERIZON", "WMT": "WALMART",
+}
+
+_ENTITY_RE = re.compile(r'^(.+?)_\d{4}')
+_YEAR_RE = re.compile(r'\b((?:19|20)\d{2})\b')
+# footnote markers and parentheticals: "(1)", "[2]", "(PP&E)", "(used in)", "(loss)"
+_FOOTNOTE_RE = re.compile(r'\([^)]*\)|\[\d+\]')
+_NON_ALNUM_RE = re.compile(r'[^a-z0-9]+')
+
+
+def normalize_label(text):
+    s = _FOOTNOTE_RE.sub(' ', str(text).lower()).replace('&', ' and ')
+    return _NON_ALNUM_RE.sub(' ', s).strip()
+
+
+def load_synonyms(path=RULES_PATH):
+    """
+    canonical line item -> normalized label variants, read from the evaluator's rule table
+    so both file a row under the same name ("total assets" -> "assets"). Rule labels and
+    the index-only aliases ("capex", "net sales") are both exact-match variants here.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        metrics = json.load(f)["metrics"]
+    synonyms = {}
+    for m in metrics:
+        variants = [normalize_label(p) for p in m.get("labels", []) + m.get("aliases", [])]
+        synonyms[m["name"]] = [v for v in dict.fromkeys(variants) if v]
+    return synonyms
+
+
+SYNONYMS = load_synonyms()
+
+
+def _is_number(v):
+    return isinstance(v, (int, float)) and not isinstance(v, bool) and v == v
+
+
+class LineItemIndex:
+    """
+    Inverted index from normalized row labels to the cells that carry them.
+    Built once while tables are canonicalized, so fetching one line item
+    for one company is a dict lookup instead of a scan over its csv files.
+    Labels that match a SYNONYMS variant are filed under the canonical name.
+    """
+    def __init__(self):
+        self.items = {}     # key -> company -> [[period, table, row, column, value, label]]
+        self.tables = {}    # table id -> keys it contributed, for re-indexing
+        self.aliases = {variant: key for key, variants in SYNONYMS.items() for variant in variants + [key.replace('_', ' ')]}
+        self._max_alias_len = max(len(a.split()) for a in self.aliases)
+
+    def __len__(self):
+        return sum(len(p) for by_company in self.items.values() for p in by_company.values())
+
+    def resolve(self, item):
+        norm = normalize_label(item)
+        return self.aliases.get(norm, norm)
+
+    def companies(self):
+        return {c for by_company in self.items.values() for c in by_company}
+
+    def companies_for_ticker(self, ticker):
+        # company ids ("3M_2018_10K") filed under the entity the resolved ticker stands for
+        entity = TICKER_ENTITIES.get(str(ticker).upper())
+        if not entity:
+            return []
+        found = []
+        for company in sorted(self.companies()):
+            m = _ENTITY_RE.match(company)
+            if m and m.group(1).upper().replace("_", "") == entity:
+                found.append(company)
+        return found
+
+    def _column_periods(self, columns, rows):
+        # fiscal year per column from the header + top 3 rows, like the evaluator does
+        periods = []
+        for i, col in enumerate(columns):
+            header = str(col) + " " + " ".join(str(r[i]) for r in rows[:3])
+            m = _YEAR_RE.search(header)
+            periods.append(m.group(1) if m else None)
+        return periods
+
+    def add_table(self, table_id, columns, rows, company=None):
+        """
+        columns: header cells, rows: cleaned cells (floats for numbers, str for labels).
+        company defaults to the table id without its "_<n>" suffix.
+        """
+        if table_id in self.tables:
+            self.remove_table(table_id)
+        company = company or table_id.rsplit('_', 1)[0]
+        periods = self._column_periods(columns, rows)
+        keys = set()
+        for r, row in enumerate(rows):
+            # label = text cells before the first value, "$" / blank spacer cells are skipped
+            label_cells, key = [], None
+            for c, v in enumerate(row):
+                if not _is_number(v):
+                    if key is None and any(ch.isalpha() for ch in str(v)):
+                        label_cells.append(str(v).strip())
+                    continue
+                if v == 0.0:
+                    continue
+                if key is None:
+                    key = self.resolve(" ".join(label_cells)) if label_cells else ""
+                if key:
+                    self.items.setdefault(key, {}).setdefault(company, []).append(
+                        [periods[c], table_id, r, c, float(v), " ".join(label_cells)])
+                    keys.add(key)
+        self.tables[table_id] = sorted(keys)
+
+    def cells(self, company):
+        # every indexed cell of one company: (key, period, table, row, column, value, label)
+        return [(key, *cell) for key, by_company in self.items.items() for cell in by_company.get(company, ())]
+
+    def remove_table(self, table_id):
+        for key in self.tables.pop(table_id, ()):
+            by_company = self.items.get(key, {})
+            for company in list(by_company):
+                by_company[company] = [p for p in by_company[company] if p[1] != table_id]
+                if not by_company[company]:
+                    del by_company[company]
+            if not by_company:
+                self.items.pop(key, None)
+
+    def lookup(self, item, company=None, period=None):
+        """
+        all cells filed under the item, in table/row order.
+        returns [{"item", "company", "period", "table", "row", "column", "value", "label"}]
+        """
+        key = self.resolve(item)
+        by_company = self.items.get(key, {})
+        companies = [company] if company else list(by_company)
+        hits = []
+        for c in companies:
+            for p_period, table, row, column, value, label in by_company.get(c, ()):
+                if period is not None and p_period != str(period):
+                    continue
+                hits.append({"item": key, "company": c, "period": p_period, "table": table,
+                             "row": row, "column": column, "value": value, "label": label})
+        return hits
+
+    def mentions(self, text):
+        # canonical line items named in free text, longest variant first ("net cash provided by ...")
+        tokens = normalize_label(text).split()
+        found, i = [], 0
+        while i < len(tokens):
+            for n in range(min(self._max_alias_len, len(tokens) - i), 0, -1):
+                key = self.aliases.get(" ".join(tokens[i:i + n]))
+                if key:
+                    if key not in found:
+                        found.append(key)
+                    i += n
+                    break
+            else:
+                i += 1
+        return found
+
+    # persistence next to the canonical csv files
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"items": self.items, "tables": self.tables}, f)
+
+    @classmethod
+    def load(cls, path):
+        index = cls()
+        if not os.path.exists(path):
+            return index
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        index.items = data.get("items", {})
+        index.tables = data.get("tables", {})
+        return index
@@ -0,0 +1,106 @@
+import os
+import re
+import json
+
+RULES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "line_item_rules.json")
+MEMO_SIZE = 65536
+
+
+def _trie_regex(words):
+    # "net sales|net income" -> "net\ (?:income|sales)", longer continuations tried first
+    trie = {}
+    for w in words:
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node):
+        end = "" in node
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if end:
+            return "(?:" + body + ")?"
+        return body
+    return build(trie)
+
+
+class LineItemClassifier:
+    """
+    Row-label classifier compiled from a declarative rule table
+    (data/line_item_rules.json). All labels and exclusions of all metrics
+    go into one trie-shaped regex, so a row is scanned once no matter how
+    many metrics are configured.
+    """
+    def __init__(self, rules):
+        self.metrics = sorted(rules["metrics"], key=lambda m: m["priority"])
+        self.core = [m["name"] for m in self.metrics if m.get("core")]
+        # the leading exclusive metrics (the original four) decide a row on their own when one of
+        # their labels is in it, plain substring checks like the old if/elif chain, no regex pass
+        self._fast = []
+        for m in self.metrics:
+            if not m.get("exclusive"):
+                break
+            self._fast.append((m["name"], [p.lower() for p in m.get("labels", [])], [p.lower() for p in m.get("exclude", [])]))
+        # row text -> metric; a label is classified once per value cell and repeats across tables and filings
+        self._memo = {}
+        self._owners = {}   # phrase -> [(metric index, is exclusion)]
+        for i, m in enumerate(self.metrics):
+            for phrase in m.get("labels", []):
+                self._owners.setdefault(phrase.lower(), []).append((i, False))
+            for phrase in m.get("exclude", []):
+                self._owners.setdefault(phrase.lower(), []).append((i, True))
+
+        # a lookahead reports one (the longest) phrase per start position,
+        # shorter phrases starting there are its prefixes and matched implicitly
+        phrases = list(self._owners)
+        self._implied = {p: [q for q in phrases if p.startswith(q)] for p in phrases}
+        self._pattern = re.compile("(?=(" + _trie_regex(phrases) + "))")
+
+    @classmethod
+    def load(cls, path=RULES_PATH):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def matched(self, text):
+        found = set()
+        for m in self._pattern.finditer(text):
+            found.update(self._implied[m.group(1)])
+        return found
+
+    def classify(self, text):
+        """
+        text: lowercased row text. returns the metric name or None.
+        lowest priority with a label hit wins; an exclusion hit skips the metric,
+        or rejects the row when the metric is exclusive (if/elif behaviour)
+        """
+        if text in self._memo:
+            return self._memo[text]
+        if len(self._memo) >= MEMO_SIZE:
+            self._memo.clear()
+        key = self._memo[text] = self._classify(text)
+        return key
+
+    def _classify(self, text):
+        for name, labels, exclude in self._fast:
+            for label in labels:
+                if label in text:
+                    for x in exclude:
+                        if x in text:
+                            return None
+                    return name
+        found = self.matched(text)
+        if not found:
+            return None
+        labelled, excluded = set(), set()
+        for phrase in found:
+            for i, is_exclusion in self._owners[phrase]:
+                (excluded if is_exclusion else labelled).add(i)
+        for i in sorted(labelled):
+            if i not in excluded:
+                return self.metrics[i]["name"]
+            if self.metrics[i].get("exclusive"):
+                return None
+        return None
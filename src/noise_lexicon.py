@@ -0,0 +1,91 @@
+import os
+import re
+import json
+
+LEXICON_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "noise_lexicon.json")
+
+# word runs (any script, hyphens split them), CJK / kana one character per token
+_CJK = "\u3040-\u30ff\u3400-\u9fff"
+_TOKEN_RE = re.compile(rf"[{_CJK}]|[^\W_{_CJK}]+")
+_END = object()
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(text.lower())
+
+
+class NoiseLexicon:
+    """
+    Token-trie phrase matcher for market-noise vocabulary.
+    Phrases match on whole tokens and the longest phrase starting at a
+    position wins, so the scan is one left-to-right pass over the text and
+    cost does not grow with the number of terms in the lexicon.
+    A text is noisy once its summed weight reaches threshold, and a
+    category's action fires once that category alone reaches its own
+    threshold, so one weak term ("long", "target") does not block.
+    """
+    def __init__(self, categories, threshold=1.0):
+        self.threshold = float(threshold)
+        self.actions = {name: cat.get("action") for name, cat in categories.items()}
+        self.thresholds = {name: float(cat.get("threshold", threshold)) for name, cat in categories.items()}
+        self.trie = {}
+        self.size = 0
+        for name, cat in categories.items():
+            for term, weight in cat.get("terms", {}).items():
+                self.add(term, name, weight)
+
+    @classmethod
+    def load(cls, path=LEXICON_PATH):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data["categories"], data.get("threshold", 1.0))
+
+    def add(self, term, category, weight=1.0):
+        tokens = tokenize(term)
+        if not tokens:
+            return
+        node = self.trie
+        for tok in tokens:
+            node = node.setdefault(tok, {})
+        if _END not in node:
+            self.size += 1
+        node[_END] = (term.lower(), category, float(weight))
+
+    def scan(self, text):
+        # [(phrase, category, weight)] in text order, neutral phrases included
+        tokens = tokenize(text)
+        hits, i, n = [], 0, len(tokens)
+        while i < n:
+            node, best, j = self.trie, None, i
+            while j < n:
+                node = node.get(tokens[j])
+                if node is None:
+                    break
+                j += 1
+                if _END in node:
+                    best = (node[_END], j)
+            if best:
+                hits.append(best[0])
+                i = best[1]
+            else:
+                i += 1
+        return hits
+
+    def report(self, text):
+        categories, weights, elements, score = {}, {}, [], 0.0
+        for phrase, category, weight in self.scan(text):
+            if weight <= 0:
+                continue
+            categories[category] = categories.get(category, 0) + 1
+            weights[category] = weights.get(category, 0.0) + weight
+            if phrase not in elements:
+                elements.append(phrase)
+            score += weight
+        actions = {self.actions[c] for c, w in weights.items() if self.actions.get(c) and w >= self.thresholds[c]}
+        return {
+            "is_noisy": score >= self.threshold,
+            "noise_elements": elements,
+            "categories": categories,
+            "noise_score": round(score, 2),
+            "action": "BLOCK_RECO" if "BLOCK_RECO" in actions else "IGNORE"
+        }
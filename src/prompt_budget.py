@@ -0,0 +1,145 @@
+import re
+import time
+import threading
+from collections import deque
+
+_PIECE_RE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+_encoder = None
+
+
+def count_tokens(text: str) -> int:
+    """
+    Local token count. Uses tiktoken's cl100k_base (close to the Llama 3
+    vocabulary) when it is installed, otherwise a word/punctuation estimate
+    that splits long words into ~6 character sub-word pieces.
+    """
+    global _encoder
+    if not text:
+        return 0
+    if _encoder is None:
+        try:
+            import tiktoken
+            _encoder = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoder = False
+    if _encoder:
+        return len(_encoder.encode(text, disallowed_special=()))
+    return sum(1 + (len(p) - 1) // 6 for p in _PIECE_RE.findall(text))
+
+
+def truncate_head(text: str, max_tokens: int) -> str:
+    # keep the most recent lines that fit, conversations grow at the tail
+    if count_tokens(text) <= max_tokens:
+        return text
+    kept = []
+    used = 0
+    for line in reversed(text.split("\n")):
+        cost = count_tokens(line) + 1
+        if used + cost > max_tokens:
+            if not kept:
+                # the newest line alone is over the limit: keep its tail rather than nothing
+                kept.append(_tail(line, max_tokens))
+            break
+        kept.append(line)
+        used += cost
+    return "\n".join(reversed(kept))
+
+
+def _tail(line: str, max_tokens: int) -> str:
+    # longest suffix of the line within max_tokens, found by bisecting on the start offset
+    lo, hi = 0, len(line)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if count_tokens(line[mid:]) <= max_tokens:
+            hi = mid
+        else:
+            lo = mid + 1
+    return line[lo:]
+
+
+class PromptSection:
+    def __init__(self, name, text, priority, required=False, truncatable=False):
+        self.name = name
+        self.text = text
+        self.priority = priority
+        self.required = required
+        self.truncatable = truncatable
+        self.tokens = count_tokens(text)
+
+
+class PromptBuilder:
+    """
+    Collects prompt sections with priorities and fits them into a token limit.
+    Over the limit, the lowest-priority optional section is degraded first:
+    truncatable sections lose their oldest lines, the others are dropped.
+    """
+    def __init__(self):
+        self.sections = []
+
+    def add(self, name, text, priority, required=False, truncatable=False):
+        self.sections.append(PromptSection(name, text, priority, required, truncatable))
+        return self
+
+    def total(self):
+        return sum(s.tokens for s in self.sections)
+
+    def _truncate_head(self, section, keep_tokens):
+        section.text = truncate_head(section.text, keep_tokens)
+        section.tokens = count_tokens(section.text)
+
+    def build(self, limit):
+        report = {"limit": limit, "dropped": [], "truncated": []}
+        for section in sorted((s for s in self.sections if not s.required), key=lambda s: s.priority):
+            overflow = self.total() - limit
+            if overflow <= 0:
+                break
+            if section.tokens == 0:
+                continue
+            if section.truncatable and section.tokens > overflow:
+                self._truncate_head(section, section.tokens - overflow)
+                report["truncated"].append(section.name)
+            else:
+                section.text, section.tokens = "", 0
+                report["dropped"].append(section.name)
+
+        report["sections"] = {s.name: s.tokens for s in self.sections}
+        report["prompt_tokens_est"] = self.total()
+        report["fits"] = self.total() <= limit
+        return {s.name: s.text for s in self.sections}, report
+
+
+class TokenBudget:
+    """thread-safe sliding one-minute window of tokens sent to a provider model"""
+    def __init__(self, tokens_per_minute, window_s=60.0):
+        self.tokens_per_minute = tokens_per_minute
+        self.window_s = window_s
+        self._events = deque()
+        self._lock = threading.Lock()
+
+    def _expire(self, now):
+        while self._events and now - self._events[0][0] > self.window_s:
+            self._events.popleft()
+
+    def used(self):
+        with self._lock:
+            self._expire(time.monotonic())
+            return sum(t for _, t in self._events)
+
+    def available(self):
+        return max(0, self.tokens_per_minute - self.used())
+
+    def reserve(self, tokens):
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            if sum(t for _, t in self._events) + tokens > self.tokens_per_minute:
+                return None
+            event = [now, tokens]
+            self._events.append(event)
+            return event
+
+    def settle(self, reservation, actual_tokens):
+        # replace the estimate with what the provider actually billed
+        if reservation is not None and actual_tokens is not None:
+            with self._lock:
+                reservation[1] = actual_tokens
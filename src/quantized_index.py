@@ -0,0 +1,149 @@
+import os
+import sys
+import json
+import numpy as np
+
+# set bits per byte value, for Hamming distance on packed sign codes
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _normalize(x):
+    x = np.asarray(x, dtype=np.float32)
+    norms = np.linalg.norm(x, axis=-1, keepdims=True)
+    return x / np.maximum(norms, 1e-12)
+
+
+class QuantizedIndex:
+    """
+    Compressed dense index for cosine search over chunk embeddings.
+    Keeps int8 scalar codes (1 byte/dim) and binary sign codes (1 bit/dim)
+    in memory; the float32 vectors stay on disk and are memory-mapped only
+    to re-rank the small candidate set the codes select.
+    """
+    def __init__(self):
+        self.ids = []
+        self.fields = {}    # metadata key -> per-row values, for where filters
+        self.scale = None
+        self.int8 = None
+        self.bits = None
+        self.vectors = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, ids, vectors, metadatas=None):
+        index = cls()
+        vectors = _normalize(vectors)
+        index.ids = list(ids)
+        metadatas = [m or {} for m in (metadatas or [{}] * len(index.ids))]
+        keys = sorted({key for m in metadatas for key in m if key != "chunk_id"})
+        index.fields = {key: np.array([m.get(key) for m in metadatas], dtype=object) for key in keys}
+        # symmetric per-dimension scale, so the code dot product stays proportional to cosine
+        index.scale = np.maximum(np.abs(vectors).max(axis=0), 1e-12).astype(np.float32)
+        index.int8 = np.clip(np.rint(vectors / index.scale * 127), -127, 127).astype(np.int8)
+        index.bits = np.packbits(vectors > 0, axis=1)
+        index.vectors = vectors
+        return index
+
+    @staticmethod
+    def exists(path):
+        return os.path.exists(os.path.join(path, "ids.json"))
+
+    def metadata_bytes(self):
+        # the id list and the per-row filter fields, held by every variant (object arrays + distinct values)
+        seen, total = set(), sys.getsizeof(self.ids) + sum(sys.getsizeof(i) for i in self.ids)
+        for vals in self.fields.values():
+            total += vals.nbytes
+            for v in vals:
+                if id(v) not in seen:
+                    seen.add(id(v))
+                    total += sys.getsizeof(v)
+        return total
+
+    def memory_bytes(self):
+        # resident footprint per variant, ids and filter fields included (the float matrix is mmapped after load)
+        meta = self.metadata_bytes()
+        return {"int8": self.int8.nbytes + self.scale.nbytes + meta, "binary": self.bits.nbytes + meta,
+                "float32": len(self.ids) * self.int8.shape[1] * 4 + meta, "metadata": meta}
+
+    def _rows(self, where):
+        # row numbers matching every where clause, None for the whole index
+        if not where:
+            return None
+        mask = np.ones(len(self.ids), dtype=bool)
+        for key, val in where.items():
+            if key not in self.fields:
+                raise ValueError(f"quantized index has no metadata field {key}")
+            mask &= self.fields[key] == val
+        return np.flatnonzero(mask)
+
+    def _shortlist(self, scores, n, largest=True):
+        n = min(n, len(scores))
+        return np.argpartition(-scores if largest else scores, n - 1)[:n]
+
+    def search(self, query_vec, k=10, mode="binary", candidates=100, rerank=True, where=None):
+        """
+        mode "binary": Hamming prefilter on sign codes, "int8": scaled integer dot product,
+        "float": exact scan (the reference). returns [(chunk_id, cosine)] best first
+        """
+        if not self.ids:
+            return []
+        q = _normalize(query_vec)
+        # pre-filter: only the rows of the selected slice are scored
+        subset = self._rows(where)
+        if subset is not None and not len(subset):
+            return []
+        pick = (lambda a: a) if subset is None else (lambda a: a[subset])
+        n_rows = len(self.ids) if subset is None else len(subset)
+        if mode == "float":
+            rows = self._shortlist(np.asarray(pick(self.vectors)) @ q, k)
+            rerank = True
+        elif mode == "int8":
+            q8 = np.clip(np.rint(q * self.scale / np.abs(q * self.scale).max() * 127), -127, 127).astype(np.float32)
+            codes = pick(self.int8)
+            # widened block by block so a query never materializes the whole matrix as float
+            scores = np.concatenate([codes[b:b + 65536].astype(np.float32) @ q8 for b in range(0, n_rows, 65536)])
+            rows = self._shortlist(scores, candidates if rerank else k)
+        elif mode == "binary":
+            qbits = np.packbits(q > 0)
+            dist = _POPCOUNT[np.bitwise_xor(pick(self.bits), qbits)].sum(axis=1, dtype=np.int32)
+            rows = self._shortlist(dist, candidates if rerank else k, largest=False)
+        else:
+            raise ValueError(f"unknown mode {mode}")
+        if subset is not None:
+            rows = subset[rows]
+
+        if rerank:
+            # exact cosine on the shortlist only, read from the mmapped float matrix
+            rows = np.sort(rows)
+            exact = np.asarray(self.vectors[rows]) @ q
+            order = np.argsort(-exact)[:k]
+            return [(self.ids[rows[i]], float(exact[i])) for i in order]
+        return [(self.ids[r], None) for r in rows[:k]]
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "int8.npy"), self.int8)
+        np.save(os.path.join(path, "bits.npy"), self.bits)
+        np.save(os.path.join(path, "scale.npy"), self.scale)
+        np.save(os.path.join(path, "float32.npy"), np.asarray(self.vectors, dtype=np.float32))
+        with open(os.path.join(path, "ids.json"), 'w', encoding='utf-8') as f:
+            json.dump({"ids": self.ids, "fields": {key: list(vals) for key, vals in self.fields.items()}}, f)
+
+    @classmethod
+    def load(cls, path):
+        index = cls()
+        if not os.path.exists(os.path.join(path, "ids.json")):
+            return index
+        with open(os.path.join(path, "ids.json"), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        index.ids = data["ids"]
+        # older builds only kept the source of each row
+        fields = data.get("fields") or {"source": data.get("sources", [])}
+        index.fields = {key: np.array(vals, dtype=object) for key, vals in fields.items()}
+        index.int8 = np.load(os.path.join(path, "int8.npy"))
+        index.bits = np.load(os.path.join(path, "bits.npy"))
+        index.scale = np.load(os.path.join(path, "scale.npy"))
+        index.vectors = np.load(os.path.join(path, "float32.npy"), mmap_mode="r")
+        return index
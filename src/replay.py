@@ -0,0 +1,234 @@
+import os
+import json
+import time
+import random
+import pickle
+import hashlib
+import threading
+from types import SimpleNamespace
+
+FIXTURE_DIR = "data/fixtures/replay"
+# tavily fixture entry for a recording made without a Tavily key
+NO_SEARCH_CLIENT = "no_search_client"
+
+
+class InjectedFault(Exception):
+    pass
+
+
+class FaultInjector:
+    """
+    Synthetic latency and failures per service ("yfinance", "tavily", "groq").
+    profile: {service: {"latency_s", "jitter_s", "error_rate", "rate_limit_rate"}}
+    """
+    def __init__(self, profile=None, seed=None):
+        self.profile = profile or {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.injected = {}
+
+    def apply(self, service):
+        p = self.profile.get(service, {})
+        with self._lock:
+            delay = max(0.0, p.get("latency_s", 0.0) + self._rng.uniform(-1, 1) * p.get("jitter_s", 0.0))
+            roll = self._rng.random()
+        if delay:
+            time.sleep(delay)
+        kind = None
+        if roll < p.get("rate_limit_rate", 0.0):
+            kind = "rate_limit"
+        elif roll < p.get("rate_limit_rate", 0.0) + p.get("error_rate", 0.0):
+            kind = "error"
+        if kind:
+            with self._lock:
+                self.injected[f"{service}.{kind}"] = self.injected.get(f"{service}.{kind}", 0) + 1
+            # the bridge maps "429" / "rate_limit" to the precision lock, like the real provider error
+            raise InjectedFault(f"Error code: 429 - rate_limit_exceeded (injected {service})" if kind == "rate_limit"
+                                else f"injected {service} failure")
+
+
+def _key(payload):
+    return hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class _ReplayTicker:
+    # stands in for yf.Ticker: the attributes StatementStore reads
+    def __init__(self, replayer, symbol, data):
+        self._replayer = replayer
+        self._symbol = symbol
+        self._data = data
+
+    def _get(self, name):
+        self._replayer.faults.apply("yfinance")
+        return self._data.get(name)
+
+    balance_sheet = property(lambda self: self._get("balance_sheet"))
+    income_stmt = property(lambda self: self._get("income_stmt"))
+    info = property(lambda self: self._get("info"))
+
+
+class _RecordingTicker:
+    def __init__(self, replayer, symbol, live):
+        self._replayer = replayer
+        self._symbol = symbol
+        self._live = live
+
+    def _get(self, name):
+        value = getattr(self._live, name)
+        self._replayer._record_ticker(self._symbol, name, value)
+        return value
+
+    balance_sheet = property(lambda self: self._get("balance_sheet"))
+    income_stmt = property(lambda self: self._get("income_stmt"))
+    info = property(lambda self: self._get("info"))
+
+
+class _Search:
+    # TavilyClient.search stand-in
+    def __init__(self, replayer, live=None):
+        self._replayer = replayer
+        self._live = live
+
+    def search(self, query, max_results=5, **kwargs):
+        r = self._replayer
+        key = _key({"query": query, "max_results": max_results})
+        if r.mode == "record":
+            result = self._live.search(query=query, max_results=max_results, **kwargs)
+            with r._lock:
+                r.tavily[key] = result
+            return result
+        r.faults.apply("tavily")
+        result = r.tavily.get(key)
+        r._count("tavily", result is not None)
+        return result if result is not None else {"results": []}
+
+
+class _Completions:
+    # groq client.chat.completions stand-in
+    def __init__(self, replayer, live=None):
+        self._replayer = replayer
+        self._live = live
+
+    def create(self, model, messages, **kwargs):
+        r = self._replayer
+        key = _key({"model": model, "messages": messages})
+        if r.mode == "record":
+            completion = self._live.chat.completions.create(model=model, messages=messages, **kwargs)
+            usage = getattr(completion, "usage", None)
+            with r._lock:
+                r.groq[key] = {
+                    "model": model,
+                    "content": completion.choices[0].message.content,
+                    "usage": {k: getattr(usage, k, None) for k in ("prompt_tokens", "completion_tokens", "total_tokens")} if usage else None
+                }
+            return completion
+
+        r.faults.apply("groq")
+        entry = r.groq.get(key)
+        r._count("groq", entry is not None)
+        if entry is None:
+            # prompts carry dates and live numbers, fall back to a stable pick among the same model's recordings
+            same_model = [e for e in r.groq.values() if e["model"] == model]
+            if not same_model:
+                raise InjectedFault(f"no recorded completion for {model}")
+            entry = same_model[int(key, 16) % len(same_model)]
+        usage = SimpleNamespace(**entry["usage"]) if entry.get("usage") else None
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=entry["content"]))], usage=usage)
+
+
+class Replayer:
+    """
+    Record/replay for the three external services the audit path calls.
+    mode="record" wraps live clients and stores what they return under
+    fixture_dir; mode="replay" serves those fixtures offline, with latency
+    and failures from a FaultInjector. install() wires it into a bridge.
+    """
+    def __init__(self, fixture_dir=FIXTURE_DIR, mode="replay", faults=None):
+        self.fixture_dir = fixture_dir
+        self.mode = mode
+        self.faults = faults or FaultInjector()
+        self._lock = threading.Lock()
+        self.tickers = {}
+        self.tavily = {}
+        self.groq = {}
+        self.stats = {}
+        if mode == "replay":
+            self.load()
+
+    def _count(self, service, hit):
+        with self._lock:
+            s = self.stats.setdefault(service, {"hits": 0, "misses": 0})
+            s["hits" if hit else "misses"] += 1
+
+    def _record_ticker(self, symbol, name, value):
+        with self._lock:
+            self.tickers.setdefault(symbol, {})[name] = value
+
+    # clients handed to the engine / bridge
+    def ticker_factory(self, symbol):
+        if self.mode == "record":
+            import yfinance as yf
+            return _RecordingTicker(self, symbol, yf.Ticker(symbol))
+        data = self.tickers.get(symbol)
+        self._count("yfinance", data is not None)
+        return _ReplayTicker(self, symbol, data or {})
+
+    def researcher(self, live=None):
+        # no Tavily key while recording: the engine skips search, and replays of that recording do the same
+        if self.mode == "record":
+            with self._lock:
+                if live is None:
+                    self.tavily[NO_SEARCH_CLIENT] = True
+                    return None
+                self.tavily.pop(NO_SEARCH_CLIENT, None)
+        elif self.tavily.get(NO_SEARCH_CLIENT):
+            return None
+        return _Search(self, live)
+
+    def llm_client(self, live=None):
+        return SimpleNamespace(chat=SimpleNamespace(completions=_Completions(self, live)))
+
+    def install(self, bridge):
+        engine = bridge.engine
+        engine.statements.ticker_factory = self.ticker_factory
+        live_search = engine.researcher if self.mode == "record" else None
+        live_llm = bridge.client if self.mode == "record" else None
+        # False, not None: the engine would otherwise build a live TavilyClient from its key on first use
+        engine._researcher = self.researcher(live_search) or False
+        bridge._client = self.llm_client(live_llm)
+        return bridge
+
+    def live_clients(self, bridge):
+        # services a replaying bridge would reach over the network, empty when everything is served from fixtures
+        engine = bridge.engine
+        live = []
+        if engine._researcher is not False and not isinstance(engine._researcher, _Search):
+            live.append("tavily")
+        if not isinstance(getattr(bridge._client, "chat", None), SimpleNamespace) or \
+                not isinstance(bridge._client.chat.completions, _Completions):
+            live.append("groq")
+        if getattr(engine.statements.ticker_factory, "__self__", None) is not self:
+            live.append("yfinance")
+        return live
+
+    # fixtures on disk: yfinance frames are pickled, api payloads are json
+    def save(self):
+        os.makedirs(self.fixture_dir, exist_ok=True)
+        with open(os.path.join(self.fixture_dir, "yfinance.pkl"), "wb") as f:
+            pickle.dump(self.tickers, f, protocol=pickle.HIGHEST_PROTOCOL)
+        with open(os.path.join(self.fixture_dir, "tavily.json"), "w", encoding="utf-8") as f:
+            json.dump(self.tavily, f, default=str)
+        with open(os.path.join(self.fixture_dir, "groq.json"), "w", encoding="utf-8") as f:
+            json.dump(self.groq, f)
+
+    def load(self):
+        path = os.path.join(self.fixture_dir, "yfinance.pkl")
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                self.tickers = pickle.load(f)
+        for name in ("tavily", "groq"):
+            path = os.path.join(self.fixture_dir, f"{name}.json")
+            if os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as f:
+                    setattr(self, name, json.load(f))
+        return self
@@ -0,0 +1,65 @@
+import threading
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same (stage, key): the first caller
+    runs the function, callers arriving while it is in flight wait for and
+    share its result (or its exception). Nothing is cached once the call
+    returns, caching stays with the stores that already do it.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.stats = {}     # stage -> {"executed", "coalesced"}
+
+    def _count(self, stage, field):
+        s = self.stats.setdefault(stage, {"executed": 0, "coalesced": 0})
+        s[field] += 1
+
+    def do(self, stage, key, fn):
+        """returns (result, coalesced)"""
+        with self._lock:
+            call = self._calls.get((stage, key))
+            leader = call is None
+            if leader:
+                call = self._calls[(stage, key)] = _Call()
+                self._count(stage, "executed")
+            else:
+                call.waiters += 1
+                self._count(stage, "coalesced")
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+            return call.result, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[(stage, key)]
+            call.done.set()
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+    def snapshot(self):
+        with self._lock:
+            return {stage: dict(s) for stage, s in self.stats.items()}
@@ -0,0 +1,131 @@
+import time
+import threading
+from collections import OrderedDict
+from tracing import tracer
+from single_flight import SingleFlight
+
+STATEMENTS = ("balance_sheet", "income_stmt")
+
+
+def normalize_key(label):
+    return str(label).replace(' ', '').lower()
+
+
+class StatementStore:
+    """
+    Per-ticker cache of every period yfinance returns for the balance sheet
+    and income statement. Each ticker is held as one columnar DataFrame:
+    rows are period end dates (newest first), columns are
+    (statement, normalized line item). Index normalization happens once at
+    fetch time, so every metric lookup after that is a column read.
+    Empty fetches (unknown ticker, transient yfinance failure) are kept only
+    for negative_ttl_s, and at most max_tickers are held, least recently used out.
+    Concurrent misses for one ticker share a single fetch, whoever the caller.
+    """
+    def __init__(self, ttl_s=6 * 3600, ticker_factory=None, negative_ttl_s=60, max_tickers=256, flights=None):
+        self.ttl_s = ttl_s
+        self.negative_ttl_s = negative_ttl_s
+        self.max_tickers = max_tickers
+        self.ticker_factory = ticker_factory
+        self._frames = OrderedDict()    # ticker -> (fetched_at, ttl, frame)
+        self._info = OrderedDict()
+        self._lock = threading.Lock()
+        self.flights = flights or SingleFlight()
+
+    def _get(self, cache, ticker):
+        with self._lock:
+            cached = cache.get(ticker)
+            if cached is None:
+                return None
+            fetched_at, ttl, value = cached
+            if time.time() - fetched_at >= min(ttl, self.ttl_s):
+                del cache[ticker]
+                return None
+            cache.move_to_end(ticker)
+            return value
+
+    def _put(self, cache, ticker, value, empty):
+        with self._lock:
+            cache[ticker] = (time.time(), self.negative_ttl_s if empty else self.ttl_s, value)
+            cache.move_to_end(ticker)
+            while len(cache) > self.max_tickers:
+                cache.popitem(last=False)
+
+    def _ticker(self, ticker):
+        if self.ticker_factory is None:
+            import yfinance as yf
+            self.ticker_factory = yf.Ticker
+        return self.ticker_factory(ticker)
+
+    def _fetch(self, ticker):
+        import pandas as pd
+        t = self._ticker(ticker)
+        frames = {}
+        for name in STATEMENTS:
+            df = getattr(t, name)
+            if df is None or df.empty:
+                continue
+            df = df.copy()
+            df.index = [normalize_key(k) for k in df.index]
+            df = df[~df.index.duplicated(keep="first")]
+            frames[name] = df.T.apply(pd.to_numeric, errors="coerce")
+        if not frames:
+            return pd.DataFrame()
+        combined = pd.concat(frames, axis=1)
+        return combined.sort_index(ascending=False)
+
+    def is_cached(self, ticker):
+        frame = self._get(self._frames, ticker)
+        return frame is not None and not frame.empty
+
+    def statements(self, ticker):
+        cached = self._get(self._frames, ticker)
+        if cached is not None:
+            tracer.current().set(statement_cache_hit=True)
+            return cached
+
+        def load():
+            frame = self._fetch(ticker)
+            self._put(self._frames, ticker, frame, empty=frame.empty)
+            return frame
+        frame, coalesced = self.flights.do("statements", ticker, load)
+        tracer.current().set(statement_cache_hit=False, statement_coalesced=coalesced)
+        return frame
+
+    def periods(self, ticker, statement):
+        # period end dates the given statement actually reports, newest first
+        frame = self.statements(ticker)
+        if statement not in frame.columns.get_level_values(0):
+            return []
+        block = frame[statement]
+        return list(block.index[block.notna().any(axis=1)])
+
+    def series(self, ticker, statement, keys):
+        # first matching line item across that statement's periods, or None
+        frame = self.statements(ticker)
+        if statement not in frame.columns.get_level_values(0):
+            return None
+        block = frame[statement]
+        block = block.loc[block.notna().any(axis=1)]
+        for k in keys:
+            k = normalize_key(k)
+            if k in block.columns:
+                return block[k]
+        return None
+
+    def value(self, ticker, statement, keys, period=0):
+        s = self.series(ticker, statement, keys)
+        if s is None or len(s) <= period:
+            return 0.0
+        target = s.iloc[period]
+        return float(target) if target is not None else 0.0
+
+    def info(self, ticker):
+        cached = self._get(self._info, ticker)
+        if cached is not None:
+            return cached
+        def load():
+            data = self._ticker(ticker).info or {}
+            self._put(self._info, ticker, data, empty=not data)
+            return data
+        return self.flights.do("info", ticker, load)[0]
@@ -0,0 +1,128 @@
+import os
+import json
+import hashlib
+from collections import Counter
+
+REFS_FILE = "table_refs.json"
+
+
+class TableDeduplicator:
+    """
+    Content-hash registry for canonical tables.
+    Exact duplicates (same normalized header + cells) are stored once and
+    resolved through a reference map; tables that differ from an earlier one
+    in a single column (restated prior-year columns) are flagged as near duplicates.
+    """
+    def __init__(self):
+        self.hashes = {}            # table hash -> canonical file_id
+        self.duplicates = {}        # duplicate file_id -> canonical file_id
+        self.near_duplicates = {}   # file_id -> closest earlier file_id
+        self.signatures = {}        # (rows, label column hash) -> [(file_id, column hashes)]
+
+    # normalization & hashing
+    def _norm(self, v):
+        if isinstance(v, float):
+            return repr(v + 0.0)  # folds -0.0 into 0.0
+        return " ".join(str(v).lower().split())
+
+    def column_hashes(self, columns, rows):
+        hashes = []
+        for i, col in enumerate(columns):
+            h = hashlib.sha1(self._norm(col).encode("utf-8"))
+            for row in rows:
+                h.update(b"\x1f" + self._norm(row[i]).encode("utf-8"))
+            hashes.append(h.hexdigest())
+        return hashes
+
+    def table_hash(self, col_hashes):
+        return hashlib.sha1("|".join(col_hashes).encode("utf-8")).hexdigest()
+
+    def register(self, file_id, columns, rows):
+        """
+        returns the canonical file_id when this table is an exact duplicate,
+        otherwise registers it and returns None (the caller writes the csv)
+        """
+        col_hashes = self.column_hashes(columns, rows)
+        digest = self.table_hash(col_hashes)
+
+        canonical = self.hashes.get(digest)
+        # refs are loaded across runs, so a rerun meets its own tables again: those stay canonical
+        if canonical is not None and canonical != file_id:
+            self.duplicates[file_id] = canonical
+            return canonical
+
+        self.duplicates.pop(file_id, None)
+        self.near_duplicates.pop(file_id, None)
+        self.hashes[digest] = file_id
+        key = f"{len(rows)}:{col_hashes[0]}"
+        # an earlier run's signature of this table is replaced, not compared against
+        candidates = [c for c in self.signatures.get(key, []) if c[0] != file_id]
+        mine = Counter(col_hashes[1:])
+        # with a single value column, "one column differs" would match any table with the same labels
+        if len(mine) >= 2:
+            for other_id, other_hashes in candidates:
+                # on a rerun the later table of a pair is already flagged against this one
+                if len(other_hashes) < 2 or self.near_duplicates.get(other_id) == file_id:
+                    continue
+                other = Counter(other_hashes)
+                # one column swapped, added or dropped
+                if sum((mine - other).values()) <= 1 and sum((other - mine).values()) <= 1:
+                    self.near_duplicates[file_id] = other_id
+                    break
+        candidates.append((file_id, col_hashes[1:]))
+        self.signatures[key] = candidates
+        return None
+
+    def forget(self, file_ids):
+        """
+        drops the tables of a filing that is about to be re-ingested.
+        a dropped table that other tables still resolve to hands its place to the first
+        of those duplicates, so the filing can write new content under its old id.
+        returns {old canonical id: new canonical id}, the caller renames those csv files
+        """
+        file_ids = set(file_ids)
+        heirs = {}
+        for d, c in sorted(self.duplicates.items()):
+            if c in file_ids and d not in file_ids and c not in heirs:
+                heirs[c] = d
+        for file_id in file_ids:
+            self.duplicates.pop(file_id, None)
+            self.near_duplicates.pop(file_id, None)
+        for heir in heirs.values():
+            self.duplicates.pop(heir, None)
+        self.duplicates = {d: heirs.get(c, c) for d, c in self.duplicates.items()}
+        self.near_duplicates = {f: heirs.get(o, o) for f, o in self.near_duplicates.items() if o not in file_ids or o in heirs}
+        self.hashes = {h: heirs.get(c, c) for h, c in self.hashes.items() if c not in file_ids or c in heirs}
+        for key in list(self.signatures):
+            kept = [(heirs.get(s[0], s[0]), s[1]) for s in self.signatures[key] if s[0] not in file_ids or s[0] in heirs]
+            if kept:
+                self.signatures[key] = kept
+            else:
+                del self.signatures[key]
+        return heirs
+
+    def resolve(self, file_id):
+        return self.duplicates.get(file_id, file_id)
+
+    # persistence next to the canonical csv files
+    def load(self, output_dir):
+        path = os.path.join(output_dir, REFS_FILE)
+        if not os.path.exists(path):
+            return self
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self.hashes = data.get("hashes", {})
+        self.duplicates = data.get("duplicates", {})
+        self.near_duplicates = data.get("near_duplicates", {})
+        self.signatures = {k: [tuple(c) for c in v] for k, v in data.get("signatures", {}).items()}
+        return self
+
+    def save(self, output_dir):
+        path = os.path.join(output_dir, REFS_FILE)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "hashes": self.hashes,
+                "duplicates": self.duplicates,
+                "near_duplicates": self.near_duplicates,
+                "signatures": self.signatures
+            }, f)
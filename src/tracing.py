@@ -0,0 +1,189 @@
+import os
+import json
+import time
+import uuid
+import queue
+import atexit
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+# active span of the current thread / task, used for nesting
+_current_span = contextvars.ContextVar("audit_current_span", default=None)
+
+
+def _clip(value, limit):
+    # long string attributes (the formatted audit_context) are cut in the exported file
+    if limit is not None and isinstance(value, str) and len(value) > limit:
+        return value[:limit] + f"... [{len(value) - limit} chars truncated]"
+    return value
+
+
+class Span:
+    def __init__(self, name, trace_id, parent=None, attrs=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent = parent
+        self.attrs = dict(attrs or {})
+        self.children = []
+        self.status = "OK"
+        self.error = None
+        self.started_at = datetime.now().isoformat()
+        self._start = time.perf_counter()
+        self.duration_ms = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+        return self
+
+    def incr(self, key, amount=1):
+        self.attrs[key] = self.attrs.get(key, 0) + amount
+        return self
+
+    def record_error(self, exc):
+        self.status = "ERROR"
+        self.error = f"{type(exc).__name__}: {exc}" if isinstance(exc, BaseException) else str(exc)
+        return self
+
+    def finish(self):
+        if self.duration_ms is None:
+            self.duration_ms = round((time.perf_counter() - self._start) * 1000, 3)
+
+    def to_dict(self, max_attr_chars=None):
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "error": self.error,
+            "attrs": {k: _clip(v, max_attr_chars) for k, v in self.attrs.items()},
+            "children": [c.to_dict(max_attr_chars) for c in self.children]
+        }
+
+
+class Tracer:
+    """
+    Nested span recorder for the audit pipeline.
+    Finished root spans are kept in an in-process ring buffer and,
+    when export_path is set, appended as one JSON line per trace by a
+    background writer. The request thread only enqueues: a full queue
+    drops the trace, string attributes longer than max_attr_chars are
+    cut in the file (None keeps them whole), and the file is rotated to
+    .1 .. .<backups> once it passes max_bytes.
+    """
+    def __init__(self, export_path=None, buffer_size=200, enabled=True,
+                 max_attr_chars=2000, max_bytes=50 * 1024 * 1024, backups=3, queue_size=1000):
+        self.export_path = export_path
+        self.enabled = enabled
+        self.max_attr_chars = max_attr_chars
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.dropped = 0
+        self._buffer = deque(maxlen=buffer_size)
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._writer = None
+
+    @contextmanager
+    def span(self, name, **attrs):
+        if not self.enabled:
+            yield _NULL_SPAN
+            return
+
+        parent = _current_span.get()
+        trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        sp = Span(name, trace_id, parent=parent, attrs=attrs)
+        if parent is not None:
+            parent.children.append(sp)
+
+        token = _current_span.set(sp)
+        try:
+            yield sp
+        except BaseException as e:
+            sp.record_error(e)
+            raise
+        finally:
+            sp.finish()
+            _current_span.reset(token)
+            if parent is None:
+                self._export(sp)
+
+    def current(self):
+        # annotate the active span from deep inside a stage, no-op outside a trace
+        return _current_span.get() or _NULL_SPAN
+
+    def recent(self, n=20):
+        with self._lock:
+            traces = list(self._buffer)
+        return traces[-n:][::-1]
+
+    def clear(self):
+        with self._lock:
+            self._buffer.clear()
+
+    def flush(self):
+        # block until every queued trace is on disk (scripts, tests, shutdown)
+        if self._writer is not None:
+            self._queue.join()
+
+    def _export(self, root):
+        with self._lock:
+            self._buffer.append({"trace_id": root.trace_id, **root.to_dict()})
+            if not self.export_path:
+                return
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="trace-writer", daemon=True)
+                self._writer.start()
+                atexit.register(self.flush)
+        try:
+            self._queue.put_nowait({"trace_id": root.trace_id, **root.to_dict(self.max_attr_chars)})
+        except queue.Full:
+            self.dropped += 1
+
+    def _write_loop(self):
+        while True:
+            record = self._queue.get()
+            try:
+                line = json.dumps(record, default=str) + "\n"
+                os.makedirs(os.path.dirname(self.export_path) or ".", exist_ok=True)
+                self._rotate(len(line.encode("utf-8")))
+                with open(self.export_path, "a", encoding="utf-8") as f:
+                    f.write(line)
+            except (OSError, TypeError, ValueError):
+                # tracing must never break an audit
+                pass
+            finally:
+                self._queue.task_done()
+
+    def _rotate(self, incoming):
+        if not self.max_bytes or not os.path.exists(self.export_path):
+            return
+        if os.path.getsize(self.export_path) + incoming <= self.max_bytes:
+            return
+        if self.backups <= 0:
+            os.remove(self.export_path)
+            return
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.export_path}.{i}"):
+                os.replace(f"{self.export_path}.{i}", f"{self.export_path}.{i + 1}")
+        os.replace(self.export_path, f"{self.export_path}.1")
+
+
+class _NullSpan:
+    name = None
+    trace_id = None
+
+    def set(self, **attrs): return self
+    def incr(self, key, amount=1): return self
+    def record_error(self, exc): return self
+
+
+_NULL_SPAN = _NullSpan()
+
+tracer = Tracer(export_path=os.environ.get("AUDIT_TRACE_PATH", "data/results/traces/audit_traces.jsonl"),
+                max_attr_chars=int(os.environ.get("AUDIT_TRACE_ATTR_CHARS", 2000)) or None,
+                max_bytes=int(os.environ.get("AUDIT_TRACE_MAX_MB", 50)) * 1024 * 1024)